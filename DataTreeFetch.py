@@ -0,0 +1,266 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+'''
+DataTreeFetch is part of DataTreeGrab. It fetches the pages a DataTreeShell
+describes with get_url over a pool of kept-alive connections, with a limit on
+the concurrent requests per host and a timeout, and extracts each page as soon
+as it is fetched.
+
+    LICENSE
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 2 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.'''
+
+from __future__ import unicode_literals
+import sys, socket, httplib, urllib, urlparse, re
+from threading import Thread, RLock, BoundedSemaphore
+from Queue import Queue
+from DataTreeGrab import dte, dtUrlWarning
+
+class ConnectionPool():
+    """
+    Keeps the idle kept-alive connections per (scheme, host, port) for reuse
+    and limits the number of concurrent requests per host
+    """
+    def __init__(self, per_host = 2, timeout = 30, max_redirects = 5):
+        self.pool_lock = RLock()
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.idle = {}
+        self.host_limits = {}
+
+    def host_limit(self, key):
+        with self.pool_lock:
+            if not key in self.host_limits.keys():
+                self.host_limits[key] = BoundedSemaphore(self.per_host)
+
+            return self.host_limits[key]
+
+    def get_connection(self, key):
+        # Return an idle connection and True or a new one and False
+        with self.pool_lock:
+            if len(self.idle.get(key, [])) > 0:
+                return (self.idle[key].pop(), True)
+
+        scheme, host, port = key
+        if scheme == 'https':
+            return (httplib.HTTPSConnection(host, port, timeout = self.timeout), False)
+
+        return (httplib.HTTPConnection(host, port, timeout = self.timeout), False)
+
+    def release_connection(self, key, conn):
+        with self.pool_lock:
+            self.idle.setdefault(key, []).append(conn)
+
+    def request(self, url, post_data = None, headers = None):
+        # Return (status, response headers, body) following any redirects
+        # It raises the httplib and socket errors
+        method = 'GET' if post_data in (None, {}) else 'POST'
+        body = None
+        headers = {} if headers == None else headers.copy()
+        if method == 'POST':
+            body = urllib.urlencode([(unicode(k).encode('utf-8'), unicode(v).encode('utf-8')) \
+                for k, v in post_data.items()])
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        for redirect in range(self.max_redirects + 1):
+            status, rheaders, data = self.request_once(url, method, body, headers)
+            if not status in (301, 302, 303, 307) or rheaders.get('location') in (None, ''):
+                return (status, rheaders, data)
+
+            url = urlparse.urljoin(url, rheaders['location'])
+            if status == 303:
+                method, body = 'GET', None
+
+        return (status, rheaders, data)
+
+    def request_once(self, url, method, body, headers):
+        parts = urlparse.urlsplit(url)
+        if not parts.scheme in ('http', 'https') or parts.hostname == None:
+            raise httplib.InvalidURL('Invalid url: %s' % (url, ))
+
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path if parts.path != '' else '/'
+        if parts.query != '':
+            path = '%s?%s' % (path, parts.query)
+
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+
+        bheaders = dict([(unicode(k).encode('ascii'), unicode(v).encode('utf-8')) for k, v in headers.items()])
+        with self.host_limit(key):
+            while True:
+                conn, reused = self.get_connection(key)
+                try:
+                    conn.request(method.encode('ascii'), path, body, bheaders)
+                    response = conn.getresponse()
+                    data = response.read()
+
+                except httplib.IncompleteRead:
+                    conn.close()
+                    raise
+
+                except (httplib.BadStatusLine, socket.error, httplib.HTTPException):
+                    conn.close()
+                    if reused:
+                        # The server closed the kept-alive connection, so try a fresh one
+                        continue
+
+                    raise
+
+                if response.will_close:
+                    conn.close()
+
+                else:
+                    self.release_connection(key, conn)
+
+                return (response.status, dict(response.getheaders()), data)
+
+    def close(self):
+        with self.pool_lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+
+            self.idle = {}
+
+# end ConnectionPool()
+
+class PageFetcher():
+    """
+    Fetches the pages given by a list of url_data dicts through the get_url_plan
+    function of a DataTreeShell, in a number of fetching threads and extracts
+    them with the extract_many function of that shell.
+    """
+    def __init__(self, shell, connections = 4, per_host = 2, timeout = 30):
+        self.shell = shell
+        self.connections = connections
+        self.pool = ConnectionPool(per_host, timeout)
+
+    def fetch_page(self, url_def):
+        # Return (errorcode, page text) for one get_url tuple
+        if url_def == None:
+            return (dte.dtURLerror, None)
+
+        url, encoding, headers, post_data, is_json = url_def
+        try:
+            status, rheaders, data = self.pool.request(url, post_data, headers)
+            errorcode = dte.dtDataOK
+
+        except socket.timeout:
+            self.warn('Fetching "%s" timed out' % (url, ), 2)
+            return (dte.dtTimeoutError, None)
+
+        except httplib.IncompleteRead as e:
+            # init_data can still use the start of a html page
+            self.warn('Incomplete read on "%s"' % (url, ), 2)
+            status, rheaders, data = (200, {}, e.partial)
+            errorcode = dte.dtIncompleteRead
+
+        except (httplib.HTTPException, socket.error, ValueError) as e:
+            self.warn('Unable to fetch "%s": %s' % (url, e), 2)
+            return (dte.dtURLerror, None)
+
+        if status >= 400:
+            self.warn('Fetching "%s" returned HTTP status %s' % (url, status), 2)
+            return (dte.dtHTTPerror, None)
+
+        if data in (None, b''):
+            return (dte.dtEmpty, None)
+
+        if encoding in (None, ''):
+            charset = re.search('charset=([-\w]+)', rheaders.get('content-type', ''))
+            encoding = charset.group(1) if charset != None else 'utf-8'
+
+        try:
+            return (errorcode, data.decode(encoding, 'replace'))
+
+        except LookupError:
+            return (errorcode, data.decode('utf-8', 'replace'))
+
+    def fetch_all(self, url_data_list):
+        # A generator yielding (index, errorcode, page text) for every url_data in
+        # url_data_list in the order they are fetched
+        def fetcher():
+            while True:
+                job = jobs.get()
+                if job == None:
+                    break
+
+                try:
+                    errorcode, data = self.fetch_page(job[1])
+
+                except:
+                    self.warn('Fetching %s failed: %s' % (job[1], sys.exc_info()[1]), 1)
+                    errorcode, data = (dte.dtUnknownError, None)
+
+                results.put((job[0], errorcode, data))
+
+        jobs = Queue()
+        results = Queue()
+        url_plan = self.shell.get_url_plan(list(url_data_list))
+        for index in range(len(url_plan)):
+            jobs.put((index, url_plan[index]))
+
+        for i in range(max(1, min(self.connections, len(url_plan)))):
+            jobs.put(None)
+            t = Thread(target = fetcher)
+            t.daemon = True
+            t.start()
+
+        for i in range(len(url_plan)):
+            yield results.get()
+
+    def extract_all(self, url_data_list, workers = 1, batch_typing = False, columnar = False):
+        # A generator yielding (index, errorcode, result) for every url_data in url_data_list.
+        # Each fetched page goes to extract_many of the shell, with workers > 1 in its
+        # process pool. A page that failed to fetch is yielded with its errorcode and an
+        # empty result. The fetching is done in the fetch_all threads. pages() only hands on
+        # their output and with workers > 1 runs in the task thread of the process pool, so
+        # it puts the failures in a Queue, which is emptied here before each extracted page
+        # is yielded and at the end. index is the position in url_data_list.
+        def pages():
+            for index, errorcode, data in self.fetch_all(url_data_list):
+                if data == None:
+                    failed.put((index, errorcode, []))
+
+                else:
+                    if errorcode != dte.dtDataOK:
+                        fetch_errors[index] = errorcode
+
+                    yield (index, data)
+
+        failed = Queue()
+        fetch_errors = {}
+        for index, errorcode, result in self.shell.extract_many(pages(), workers, batch_typing, columnar):
+            while not failed.empty():
+                yield failed.get()
+
+            if errorcode == dte.dtDataOK and index in fetch_errors.keys():
+                # The page was extracted, but incomplete
+                errorcode = fetch_errors[index]
+
+            yield (index, errorcode, result)
+
+        while not failed.empty():
+            yield failed.get()
+
+    def close(self):
+        self.pool.close()
+
+    def warn(self, message, severity):
+        self.shell.warn(message, dtUrlWarning, severity, 3)
+
+# end PageFetcher()
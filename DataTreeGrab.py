@@ -35,10 +35,11 @@ For the newest version and documentation see:
     along with this program.  If not, see <http://www.gnu.org/licenses/>.'''
 
 from __future__ import unicode_literals
-import re, sys, traceback, types, pickle
-import time, datetime, pytz
+import re, sys, os, traceback, types, json, hashlib, tempfile
+import time, datetime, pytz, multiprocessing
 from threading import RLock
-from Queue import Queue
+from Queue import Queue, Empty
+from collections import OrderedDict
 
 try:
     from html.parser import HTMLParser, HTMLParseError
@@ -50,11 +51,16 @@ try:
 except ImportError:
     from htmlentitydefs import name2codepoint
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 dt_name = u'DataTreeGrab'
 dt_major = 1
 dt_minor = 4
-dt_patch = 0
-dt_patchdate = u'20170710'
+dt_patch = 1
+dt_patchdate = u'20261019'
 dt_alfa = False
 dt_beta = False
 _warnings = None
@@ -178,6 +184,396 @@ def extend_list(base_list, extend_list):
     return base_list
 # end extend_list()
 
+def match_set(values):
+    """
+    Return the values as a frozenset to test membership against
+    falling back to a tuple if any of them is unhashable
+    """
+    try:
+        return frozenset(values)
+
+    except TypeError:
+        return tuple(values)
+# end match_set()
+
+def hashable_def(item):
+    """
+    Return a data_def item with any list or dict in it replaced
+    by a tuple, so it can be used as a dict key
+    """
+    if isinstance(item, dict):
+        return tuple([(k, hashable_def(v)) for k, v in sorted(item.items())])
+
+    elif isinstance(item, (list, tuple)):
+        return tuple([hashable_def(v) for v in item])
+
+    return item
+# end hashable_def()
+
+def link_strip_tail(data, default, link_warning, current_date, timezone):
+    """Strip data[1] from the end of data[0] if present and make sure it's unicode"""
+    if not is_data_value(0, data, str):
+        link_warning('Missing or invalid data value 0')
+        if default != None:
+            return default
+
+        return u''
+
+    if is_data_value(1, data, str) and data[0].strip().lower()[-len(data[1]):] == data[1].lower():
+        return unicode(data[0][:-len(data[1])]).strip()
+
+    else:
+        return unicode(data[0]).strip()
+# end link_strip_tail()
+
+def link_strip_head(data, default, link_warning, current_date, timezone):
+    """Strip data[1] from the start of data[0] if present and make sure it's unicode"""
+    if not is_data_value(0, data, str):
+        link_warning('Missing or invalid data value 0')
+        if default != None:
+            return default
+
+        return u''
+
+    if is_data_value(1, data, str) and data[0].strip().lower()[:len(data[1])] == data[1].lower():
+        return unicode(data[0][len(data[1]):]).strip()
+
+    else:
+        return unicode(data[0]).strip()
+# end link_strip_head()
+
+def link_concat(data, default, link_warning, current_date, timezone):
+    """Concatenate stringparts and make sure it's unicode"""
+    dd = u''
+    for d in data:
+        if d != None:
+            try:
+                dd += unicode(d)
+
+            except:
+                link_warning('Invalid data value')
+                continue
+
+    return dd
+# end link_concat()
+
+def link_path_parts(data, default, link_warning, current_date, timezone):
+    """Get 1 or more parts of a path"""
+    if is_data_value(0, data, str):
+        dd = data[0].split('/')
+
+        if is_data_value(1, data, int):
+            if data[1] < len(dd):
+                return dd[data[1]]
+
+            else:
+                link_warning('Missing or invalid data value 1')
+
+        elif is_data_value(1, data, list):
+            rval = u''
+            for dpart in data[1]:
+                if isinstance(dpart, int) and dpart < len(dd):
+                    rval = u'%s/%s' % (rval, dpart)
+
+                else:
+                    link_warning('Missing or invalid data value in list 1')
+
+            if len(rval) == 0:
+                return rval
+
+            else:
+                return rval[1:]
+
+    else:
+        link_warning('Missing or invalid data value 0')
+
+    if default == None:
+        return u''
+
+    else:
+        return default
+# end link_path_parts()
+
+def link_combine_date_time(data, default, link_warning, current_date, timezone):
+    """Combine a date and time value"""
+    if not is_data_value(0, data, datetime.date):
+        if is_data_value(4, data, datetime.date):
+            data[0] = data[4]
+
+        else:
+            data[0] = current_date
+
+    if not(is_data_value(0, data, datetime.date) \
+      and is_data_value(1, data, datetime.time) \
+      and is_data_value(2, data, int)):
+        link_warning('Missing or invalid date and/or time values')
+        return default
+
+    dtm = timezone.localize(datetime.datetime.combine(data[0], data[1]))
+    dtm = pytz.utc.normalize(dtm.astimezone(pytz.utc))
+    if is_data_value(3, data, datetime.time):
+        # We check if this time is after the first and if so we assume a midnight passing
+        dc = timezone.localize(datetime.datetime.combine(data[0], data[1]))
+        dc = pytz.utc.normalize(dc.astimezone(pytz.utc))
+        if dc > dtm:
+            data[0] += datetime.timedelta(days = 1)
+            dtm = timezone.localize(datetime.datetime.combine(data[0], data[1]))
+            dtm = pytz.utc.normalize(dtm.astimezone(pytz.utc))
+
+    return dtm
+# end link_combine_date_time()
+
+def link_contains(data, default, link_warning, current_date, timezone):
+    """Return True (or data[2]) if data[1] is present in data[0], else False (or data[3])"""
+    if is_data_value(0, data, str) and is_data_value(1, data, str) and data[1].lower() in data[0].lower():
+        return data_value(2, data, default = True)
+
+    return data_value(3, data, default = False)
+# end link_contains()
+
+def link_compare(data, default, link_warning, current_date, timezone):
+    """Compare the values 1 and 2 returning 3 (or True) if equal, 4 (or False) if unequal and 5 (or None) if one of them is None"""
+    if not is_data_value(0, data, None, True) or not is_data_value(1, data, None, True):
+        return data_value(4, data, default = None)
+
+    elif data[0] == data[1]:
+        return data_value(2, data, default = True)
+
+    return data_value(3, data, default = False)
+# end link_compare()
+
+def link_choose(data, default, link_warning, current_date, timezone):
+    """Return a string on value True"""
+    if is_data_value(0, data, bool):
+        if data[0] and is_data_value(1, data):
+            return data[1]
+
+        elif not data[0] and is_data_value(2, data):
+            return data[2]
+
+        else:
+            link_warning('Missing return values 1 and or 2')
+
+    link_warning('No boolean value 0')
+    return default
+# end link_choose()
+
+def link_longest_text(data, default, link_warning, current_date, timezone):
+    """Return the longest not empty text value"""
+    text = default if isinstance(default, (str, unicode)) else u''
+    if len(data) == 0:
+        link_warning('Missing data values')
+        return text
+
+    for item in range(len(data)):
+        if is_data_value(item, data, str):
+            if len(data[item]) > len(text):
+                text = unicode(data[item].strip())
+
+    return text
+# end link_longest_text()
+
+def link_first_value(data, default, link_warning, current_date, timezone):
+    """Return the first not empty value"""
+    if len(data) == 0:
+        link_warning('Missing data values')
+        return default
+
+    for item in data:
+        if (isinstance(item, (str, unicode, list, tuple, dict)) and len(item) > 0) or \
+          (not isinstance(item, (str, unicode, list, tuple, dict)) and item != None):
+            return item
+# end link_first_value()
+
+def link_list_lookup(data, default, link_warning, current_date, timezone):
+    """Look for item 2 in list 0 and return the corresponding value in list1, If not found return item 3 (or None)"""
+    if len(data) < 3 :
+        link_warning('Missing data values (min. 3)')
+        return default
+
+    if not isinstance(data[0], (list,tuple)):
+        data[0] = [data[0]]
+
+    # Do not change the list in place, it can be part of the data_def
+    data[0] = [item.lower().strip() if isinstance(item, (str, unicode)) else item for item in data[0]]
+
+    if not isinstance(data[1], (list,tuple)):
+        data[1] = [data[1]]
+
+    sd = data[2].lower().strip() if isinstance(data[2], (str, unicode)) else data[2]
+
+    if sd in data[0]:
+        index = data[0].index(sd)
+        if index < len(data[1]):
+            return data[1][index]
+
+    if len(data) > 3 :
+        return data[3]
+
+    link_warning('Item 2 not found in list 0 or list 1 to short')
+    return default
+# end link_list_lookup()
+
+def link_dict_lookup(data, default, link_warning, current_date, timezone):
+    """Look for item 1 in the keys from dict 0 and return the corresponding value"""
+    if len(data) < 2:
+        link_warning('Missing data values (min. 2)')
+        return default
+
+    if is_data_value(0, data, dict):
+        data[0] =[data[0]]
+
+    if not is_data_value(1, data, list):
+        data[1] = [data[1]]
+
+    if is_data_value(0, data, list):
+        for item in data[1]:
+            if isinstance(item, (str,unicode)):
+                item = item.lower()
+
+            for sitem in data[0]:
+                if isinstance(sitem, dict):
+                    if item in sitem.keys():
+                        if isinstance(sitem[item], (list, tuple)) and len(sitem[item]) == 0:
+                            continue
+
+                        if isinstance(sitem[item], (list, tuple)) and len(sitem[item]) == 1:
+                            return sitem[item][0]
+
+                        return sitem[item]
+
+    link_warning('Item 1 not found in dict 0')
+    return default
+# end link_dict_lookup()
+
+def link_remove_text(data, default, link_warning, current_date, timezone):
+    """Remove data[1] from the string in data[0] if present and make sure it's unicode"""
+    if not is_data_value(0, data, str):
+        link_warning('Missing or invalid data value 0')
+        if default != None:
+            return default
+
+        return u''
+
+    if is_data_value(1, data, str) and data[1] in data[0]:
+        re.sub('  ', ' ', re.sub(data[1], '', data[0]))
+
+    else:
+        return unicode(data[0]).strip()
+# end link_remove_text()
+
+# The built-in link functions on their function id
+builtin_link_table = {
+    0: link_strip_tail,
+    1: link_strip_head,
+    2: link_concat,
+    3: link_path_parts,
+    4: link_combine_date_time,
+    5: link_contains,
+    6: link_compare,
+    7: link_choose,
+    8: link_longest_text,
+    9: link_first_value,
+    10: link_list_lookup,
+    11: link_dict_lookup,
+    12: link_remove_text}
+
+def builtin_link_function(fid, data, default, link_warning, current_date = None, timezone = None):
+    """
+    Evaluate the built-in link functions 0 to 12 on the data list.
+    link_warning(text, severity = 4) is called on invalid data.
+    Only function 4 depends on current_date and timezone
+    """
+    if fid in builtin_link_table.keys():
+        return builtin_link_table[fid](data, default, link_warning, current_date, timezone)
+
+    link_warning('Unknown link function',2)
+    return None
+# end builtin_link_function()
+
+cdd_schema = 2
+def encode_cdata_def(cdata_def):
+    """
+    Serialize a converted data_def to JSON, as [format, schema, data].
+    Every JSON object in data is a one key tag: "t" tuple, "f" frozenset,
+    "s" set, "d" dict as [key, value] pairs and "z" a timezone by name.
+    Any other type raises a TypeError.
+    """
+    def encode(item):
+        if item == None or isinstance(item, (bool, int, long, float, str, unicode)):
+            return item
+
+        elif isinstance(item, list):
+            return [encode(v) for v in item]
+
+        elif isinstance(item, tuple):
+            return {"t": [encode(v) for v in item]}
+
+        elif isinstance(item, frozenset):
+            return {"f": [encode(v) for v in item]}
+
+        elif isinstance(item, set):
+            return {"s": [encode(v) for v in item]}
+
+        elif isinstance(item, dict):
+            return {"d": [[encode(k), encode(v)] for k, v in item.items()]}
+
+        elif isinstance(item, datetime.tzinfo) and hasattr(item, 'zone'):
+            return {"z": item.zone}
+
+        raise TypeError('Unable to encode %r in a converted data_def' % (item, ))
+
+    return json.dumps(["DataTreeGrab cdata_def", cdd_schema, encode(cdata_def)], separators = (',', ':'))
+
+def decode_cdata_def(text):
+    """
+    The reverse of encode_cdata_def. Only plain data and pytz timezones
+    are created. Raises ValueError on anything else or on another schema
+    """
+    def decode(obj):
+        if len(obj) != 1:
+            raise ValueError('Invalid object in converted data_def')
+
+        tag, v = obj.items()[0]
+        if not isinstance(v, (list, unicode)):
+            raise ValueError('Invalid object in converted data_def')
+
+        if tag == "t":
+            return tuple(v)
+
+        elif tag == "d":
+            return dict(v)
+
+        elif tag == "f":
+            return frozenset(v)
+
+        elif tag == "s":
+            return set(v)
+
+        elif tag == "z":
+            try:
+                return pytz.timezone(v)
+
+            except pytz.UnknownTimeZoneError:
+                raise ValueError('Unknown timezone "%s" in converted data_def' % (v, ))
+
+        raise ValueError('Invalid tag "%s" in converted data_def' % (tag, ))
+
+    try:
+        data = json.loads(text, object_hook = decode)
+
+    except (TypeError, ValueError) as e:
+        raise ValueError('Not a valid converted data_def: %s' % (e, ))
+
+    if not (isinstance(data, list) and len(data) == 3 and data[0] == "DataTreeGrab cdata_def"):
+        raise ValueError('Not a converted data_def')
+
+    if data[1] != cdd_schema:
+        raise ValueError('Converted data_def schema %s is not %s' % (data[1], cdd_schema))
+
+    return data[2]
+# end decode_cdata_def()
+
 class dtWarning(UserWarning):
     # The root of all DataTreeGrab warnings.
     name = 'General Warning'
@@ -208,6 +604,7 @@ class _Warnings():
         self.warn_lock = RLock()
         self.onceregistry = {}
         self.filters = []
+        self.wants_cache = {}
         self._ids = []
         if not caller_id in self._ids:
             self._ids.append(caller_id)
@@ -228,6 +625,31 @@ class _Warnings():
 
             self.simplefilter(warnaction, dtWarning, caller_id = caller_id)
             self.defaultaction = warnaction
+            self.wants_cache = {}
+
+    def wants(self, category, caller_id = 0, severity = 1):
+        # A quick check, without creating the message, whether the filters would not
+        # just ignore a warning. A message, module or line specific filter only decides
+        # for some messages, so on "ignore" the next filters are checked for the others
+        key = (category, caller_id, severity)
+        if key in self.wants_cache:
+            return self.wants_cache[key]
+
+        with self.warn_lock:
+            for item in self.filters:
+                action, msg, cat, mod, ln, cid, sev = item
+                if issubclass(category, cat) and (cid == 0 or caller_id == cid) and (sev == 0 or severity & sev):
+                    if action == "ignore" and not (msg is None and mod is None and ln == 0):
+                        continue
+
+                    wanted = (action != "ignore")
+                    break
+
+            else:
+                wanted = (self.defaultaction != "ignore")
+
+            self.wants_cache[key] = wanted
+            return wanted
 
     def _show_warning(self, message, category, caller_id, severity, lineno):
         with self.warn_lock:
@@ -350,6 +772,7 @@ class _Warnings():
 
     def resetwarnings(self, caller_id = 0):
         with self.warn_lock:
+            self.wants_cache = {}
             if caller_id == 0:
                 self.filters[:] = []
 
@@ -368,6 +791,7 @@ class _Warnings():
             assert isinstance(lineno, int) and lineno >= 0, \
                    "lineno must be an int >= 0"
             item = (action, None, category, None, lineno, caller_id, severity)
+            self.wants_cache = {}
             if item in self.filters:
                 self.filters.remove(item)
             if append:
@@ -388,6 +812,7 @@ class _Warnings():
                    "lineno must be an int >= 0"
             item = (action, re.compile(message, re.I), category,
                     re.compile(module), lineno, caller_id, severity)
+            self.wants_cache = {}
             if item in self.filters:
                 self.filters.remove(item)
             if append:
@@ -397,6 +822,18 @@ class _Warnings():
 
 # end _Warnings()
 
+class _WarningForwarder(Queue):
+    # Takes the place of a Queue warngoal in a worker process
+    # and passes the warnings on to the parent process
+    def __init__(self, mpqueue):
+        Queue.__init__(self)
+        self.mpqueue = mpqueue
+
+    def put(self, item, block=True, timeout=None):
+        self.mpqueue.put(('warning', None, item))
+
+# end _WarningForwarder()
+
 class dtErrorConstants():
     # DataTreeShell errorcodes
     dtQuiting = -1
@@ -461,6 +898,273 @@ class dtErrorConstants():
 # end dtErrorConstants()
 dte = dtErrorConstants()
 
+class PathDefCache():
+    """
+    A bounded LRU cache of converted path_defs, keyed on a canonical (JSON) form
+    of the raw path_def and the data_def defaults the conversion depends on. It is
+    shared by all trees and threads, so the ad-hoc path_defs given to
+    DATAtree.find_data_value are only converted once per set of defaults.
+    Conversions with errors are not stored, so their warnings are given again
+    on every use.
+    """
+    def __init__(self, maxsize = 256):
+        self.cache_lock = RLock()
+        self.cache = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def cache_key(self, path_def, context = None):
+        try:
+            return json.dumps([path_def, context], sort_keys = True)
+
+        except (TypeError, ValueError):
+            # Not JSON serializable, so not cachable
+            return None
+
+    def get(self, path_def, convert, context = None):
+        # Return the cached conversion of path_def or convert and store it
+        # convert(path_def) returns (converted path_def, errorcode)
+        # context holds whatever else the conversion depends on
+        key = self.cache_key(path_def, context)
+        with self.cache_lock:
+            if key in self.cache:
+                self.hits += 1
+                cpath = self.cache.pop(key)
+                self.cache[key] = cpath
+                return cpath
+
+            self.misses += 1
+
+        cpath, errorcode = convert(path_def)
+        if key != None and errorcode == dte.dtDataDefOK:
+            with self.cache_lock:
+                self.cache[key] = cpath
+                while len(self.cache) > self.maxsize:
+                    self.cache.popitem(last = False)
+
+        return cpath
+
+    def set_maxsize(self, maxsize):
+        with self.cache_lock:
+            self.maxsize = maxsize if (isinstance(maxsize, int) and maxsize >= 0) else 0
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last = False)
+
+    def clear(self):
+        with self.cache_lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.cache_lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "size": len(self.cache),
+                    "maxsize": self.maxsize}
+
+# end PathDefCache()
+path_def_cache = PathDefCache()
+
+class RegexCache():
+    """
+    The compiled form of every regex used by the converted data_defs, keyed on
+    (pattern, flags). It holds far more patterns than the re module cache, so
+    with many data_defs loaded the patterns are not compiled over and over again.
+    Like the re module cache it is emptied when it grows beyond maxsize.
+    DataDef_Convert fills it on conversion. A pattern not yet present, like
+    with a loaded cdata_def, is compiled on first use.
+    """
+    def __init__(self, maxsize = 4096):
+        self.cache_lock = RLock()
+        self.regexes = {}
+        self.maxsize = maxsize
+        self.misses = 0
+
+    def compile(self, pattern, flags = 0):
+        # Return the compiled pattern. An invalid pattern raises re.error
+        # A lookup does not lock, as a dict lookup is atomic
+        try:
+            return self.regexes[(pattern, flags)]
+
+        except KeyError:
+            pass
+
+        regex = re.compile(pattern, flags)
+        with self.cache_lock:
+            self.misses += 1
+            if len(self.regexes) >= self.maxsize:
+                self.regexes = {}
+
+            self.regexes[(pattern, flags)] = regex
+
+        return regex
+
+    def count(self):
+        return len(self.regexes)
+
+    def set_maxsize(self, maxsize):
+        with self.cache_lock:
+            self.maxsize = maxsize if (isinstance(maxsize, int) and maxsize > 0) else 1
+            if len(self.regexes) > self.maxsize:
+                self.regexes = {}
+
+    def clear(self):
+        with self.cache_lock:
+            self.regexes = {}
+            self.misses = 0
+
+    def stats(self):
+        with self.cache_lock:
+            return {"misses": self.misses,
+                    "size": len(self.regexes),
+                    "maxsize": self.maxsize}
+
+# end RegexCache()
+regex_cache = RegexCache()
+
+def translate_table(*tables):
+    # Merge one or more {character: replacement} dicts into a unicode.translate table
+    ttable = {}
+    for table in tables:
+        for k, v in table.items():
+            ttable[ord(k)] = unicode(v)
+
+    return ttable
+
+class AsciiReplaceTable(dict):
+    """
+    A unicode.translate table for the "ascii-replace" keyword. Any not
+    transliterated non ascii character and any '?' is replaced by replace_char.
+    Characters are added on first encounter, so a value is translated in one pass.
+    """
+    def __init__(self, table, replace_char):
+        dict.__init__(self, translate_table(table))
+        self.replace_char = unicode(replace_char)
+        self[ord('?')] = self.replace_char
+
+    def __missing__(self, key):
+        value = key if key < 128 else self.replace_char
+        self[key] = value
+        return value
+
+# end AsciiReplaceTable()
+
+class ColumnarResult():
+    """
+    An extraction result stored per column: one list per value id or linked key,
+    with a matching validity mask that is False where the value is missing.
+    Indexing or iterating gives a ColumnarRow, a light mapping view on one row.
+    """
+    def __init__(self, names):
+        self.names = list(names)
+        self.columns = {}
+        self.valid = {}
+        for name in self.names:
+            self.columns[name] = []
+            self.valid[name] = []
+
+        self.length = 0
+
+    def append_list(self, vlist):
+        # Add a value list as extracted by DATAtree, with None for a missing value
+        for index in range(len(self.names)):
+            value = vlist[index] if index < len(vlist) else None
+            self.columns[self.names[index]].append(value)
+            self.valid[self.names[index]].append(value != None)
+
+        self.length += 1
+
+    def append_dict(self, values):
+        # Add a dict as returned by DataTreeShell.link_values, missing keys are invalid
+        for name in self.names:
+            if name in values:
+                self.columns[name].append(values[name])
+                self.valid[name].append(True)
+
+            else:
+                self.columns[name].append(None)
+                self.valid[name].append(False)
+
+        self.length += 1
+
+    def column(self, name):
+        return self.columns[name]
+
+    def mask(self, name):
+        return self.valid[name]
+
+    def array(self, name):
+        # The column as a numpy masked array if numpy is available, else as a list
+        if numpy == None:
+            return self.columns[name]
+
+        return numpy.ma.masked_array(numpy.array(self.columns[name], dtype = object),
+                mask = [not v for v in self.valid[name]])
+
+    def row(self, index):
+        if index < 0:
+            index += self.length
+
+        if not 0 <= index < self.length:
+            raise IndexError('row index out of range')
+
+        return ColumnarRow(self, index)
+
+    def rows(self):
+        for index in range(self.length):
+            yield ColumnarRow(self, index)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.row(index)
+
+    def __iter__(self):
+        return self.rows()
+
+# end ColumnarResult()
+
+class ColumnarRow():
+    """A read-only mapping view on one row of a ColumnarResult, showing only the valid values"""
+    def __init__(self, result, index):
+        self.result = result
+        self.index = index
+
+    def __getitem__(self, name):
+        if not name in self.result.valid or not self.result.valid[name][self.index]:
+            raise KeyError(name)
+
+        return self.result.columns[name][self.index]
+
+    def __contains__(self, name):
+        return name in self.result.valid and self.result.valid[name][self.index]
+
+    def get(self, name, default = None):
+        return self[name] if name in self else default
+
+    def keys(self):
+        return [name for name in self.result.names if self.result.valid[name][self.index]]
+
+    def values(self):
+        return [self.result.columns[name][self.index] for name in self.keys()]
+
+    def items(self):
+        return [(name, self.result.columns[name][self.index]) for name in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        return dict(self.items())
+
+# end ColumnarRow()
+
 class DataTreeConstants():
     # The allowances for a path_def
     pathWithValue = 1
@@ -485,6 +1189,8 @@ class DataTreeConstants():
     storePathValue =256
     getOnlyOne = 512
     getLast = 1024
+    hasValueLinks = 2048
+    deferType = 4096
     node_name = {
             isNone: "Empty node_def",
             isNodeSel: "Node Selection node_def",
@@ -533,6 +1239,13 @@ class DataTreeConstants():
     valLinkMin = 4
     valLinkNext = 8
     valLinkPrevious = 16
+    # The pre-resolved match lists in a node selection
+    mlConst = 0
+    mlLinks = 1
+    mlAny = 2
+    mlName = 3
+    mlType = 4
+    mlValues = 5
     # What data manipulations
     calcNone = 0
     calcLettering = 1
@@ -602,6 +1315,27 @@ class DataTreeConstants():
             typeLower: "Lower",
             typeUpper: "Upper",
             typeCapitalize: "Capitalize"}
+    # The transliteration for the "lower-ascii" type, applied after lowering the value
+    asciiTable = {
+            ' ': '_', '/': '_', '!': '', '(': '', ')': '', ',': '',
+            'á': 'a', 'à': 'a', 'ä': 'a', 'â': 'a', 'ã': 'a', '@': 'a',
+            'é': 'e', 'è': 'e', 'ë': 'e', 'ê': 'e',
+            'í': 'i', 'ì': 'i', 'ï': 'i', 'î': 'i',
+            'ó': 'o', 'ò': 'o', 'ö': 'o', 'ô': 'o', 'õ': 'o',
+            'ú': 'u', 'ù': 'u', 'ü': 'u', 'û': 'u',
+            'ý': 'y', 'ÿ': 'y'}
+    # Additions selectable with the "transliteration" data_def keyword
+    asciiLanguages = {
+            'de': {'ß': 'ss', 'ä': 'ae', 'ö': 'oe', 'ü': 'ue'},
+            'nl': {'ĳ': 'ij'},
+            'fr': {'ç': 'c', 'œ': 'oe', 'æ': 'ae'},
+            'es': {'ñ': 'n', 'ç': 'c'},
+            'pt': {'ç': 'c'},
+            'da': {'æ': 'ae', 'ø': 'oe', 'å': 'aa'},
+            'no': {'æ': 'ae', 'ø': 'oe', 'å': 'aa'},
+            'sv': {'å': 'a'},
+            'pl': {'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n', 'ś': 's', 'ź': 'z', 'ż': 'z'},
+            'cs': {'č': 'c', 'ď': 'd', 'ě': 'e', 'ň': 'n', 'ř': 'r', 'š': 's', 'ť': 't', 'ů': 'u', 'ž': 'z'}}
     # About the link_defs
     linkNone = 0
     linkGroup = 3
@@ -614,6 +1348,7 @@ class DataTreeConstants():
     linkhasCalc = 32
     linkhasMax = 64
     linkhasMin = 128
+    linkFolded = 256
     selPosMax = 7
     selPos = {
         selPathAll: 2,
@@ -659,17 +1394,25 @@ class DataTreeConstants():
 
         return ''
 # end DataTreeConstants()
+# The constants are shared by all converters, trees and nodes
+dtc = DataTreeConstants()
 
 class DataDef_Convert():
     def __init__(self, data_def = None, warnaction = "default", warngoal = sys.stderr, caller_id = 0):
         self.tree_lock = RLock()
         with self.tree_lock:
-            self.dtc = DataTreeConstants()
+            self.dtc = dtc
             self.known_urlid = (0, 4, 11, 14)
             self.known_linkid = (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)
+            # Function 4 depends on the current date, so it can not be evaluated at conversion
+            self.fold_linkid = (0, 1, 2, 3, 5, 6, 7, 8, 9, 10, 11, 12)
+            # The cdata_def defaults convert_path_def fills in
+            self.path_def_defaults = ("datetimestring", "time-type", "time-splitter",
+                "date-sequence", "date-splitter", "str-list-splitter")
             self.errorcode = dte.dtDataDefOK
             self.caller_id = caller_id
             self.cdata_def = {}
+            self.regex_list = set()
             self.ddtype = ""
             if sys.modules['DataTreeGrab']._warnings == None:
                 sys.modules['DataTreeGrab']._warnings = _Warnings(warnaction, warngoal, caller_id)
@@ -728,17 +1471,41 @@ class DataDef_Convert():
 
             return tuple(vlist)
 
+        # process the above and pre-resolve the values into a set in the form they are matched on
+        # only the links are left to resolve at match time
+        # return a list (set, (link, ...), anyvalue, valuetype, ltype, (value/link, ...))
+        def convert_match_list(lvalue, valuetype, ltype = None):
+            vlist = convert_value_list(lvalue)
+            clist = []
+            llist = []
+            for v in vlist:
+                if v[0] == self.dtc.valValue:
+                    clist.append(self.convert_match_value(v[1], valuetype, ltype))
+
+                else:
+                    llist.append(v)
+
+            if len(llist) > 0:
+                sel_node[0] |= self.dtc.hasValueLinks
+
+            anyvalue = bool(len(vlist) == 1 and len(clist) == 1 and clist[0] == None)
+            return (match_set(clist), tuple(llist), anyvalue, valuetype, ltype, vlist)
+
         # process an (attrs/childkeys) values dict
-        # return a list of lists (name, typeint, (value/link))
-        def convert_attr_dict(ldict):
+        # return a list of lists (name, typeint, (match list))
+        def convert_attr_dict(ldict, valuetype, ltype = None):
             llist = []
             for k, v in ldict.items():
+                if ltype == 'str' and isinstance(k, (str, unicode)):
+                    # HTML attribute names are stored in lower case
+                    k = k.lower()
+
                 if is_data_value(["not"], v):
                     dta = self.dtc.attrNot
-                    vl = convert_value_list(v["not"])
+                    vl = convert_match_list(v["not"], valuetype, ltype)
 
                 else:
-                    vl = convert_value_list(v)
+                    vl = convert_match_list(v, valuetype, ltype)
                     dta = self.dtc.attr
 
                 llist.append((k, dta, vl))
@@ -803,13 +1570,13 @@ class DataDef_Convert():
                         self.ddtype="html"
                         depth = data_value("depth", node_def, int, 1)
                         if is_data_value("include", node_def, list):
-                            specs = (depth, 1, node_def["include"])
+                            specs = (depth, 1, tuple(node_def["include"]))
 
                         elif is_data_value("exclude", node_def, list):
-                            specs = (depth, -1, node_def["exclude"])
+                            specs = (depth, -1, tuple(node_def["exclude"]))
 
                         else:
-                            specs = (depth, 0, [])
+                            specs = (depth, 0, ())
 
                         sel_node = [self.dtc.getInclusiveText, specs]
 
@@ -826,6 +1593,8 @@ class DataDef_Convert():
 
                 if is_data_value('ascii-replace', node_def, list) and len(node_def['ascii-replace']) > 0:
                     calc_list.append((self.dtc.calcAsciiReplace, tuple(node_def["ascii-replace"])))
+                    if len(node_def["ascii-replace"]) > 2:
+                        self.add_regex(node_def["ascii-replace"][2])
 
                 if is_data_value('lstrip', node_def, str):
                     calc_list.append((self.dtc.calcLstrip, node_def["lstrip"]))
@@ -837,6 +1606,7 @@ class DataDef_Convert():
                     sl = []
                     for i in range(int(len(node_def['sub'])/2)):
                         sl.append((node_def['sub'][i*2], node_def['sub'][i*2+1]))
+                        self.add_regex(node_def['sub'][i*2])
 
                     if len(sl) > 0:
                         calc_list.append((self.dtc.calcSub, tuple(sl)))
@@ -862,6 +1632,7 @@ class DataDef_Convert():
 
                             if len(sp) >1:
                                 sl.append(tuple(sp))
+                                self.add_regex(s[0])
 
                     if len(sl) > 0:
                         calc_list.append((self.dtc.calcSplit, tuple(sl)))
@@ -913,8 +1684,9 @@ class DataDef_Convert():
                                     data_value(['time-type', 1], node_def, str, 'am'),
                                     data_value(['time-type', 2], node_def, str, 'pm')]
 
-                        type_def = (self.dtc.typeTime, tt,data_value('time-splitter', \
+                        type_def = (self.dtc.typeTime, tuple(tt), data_value('time-splitter', \
                             node_def, str, self.cdata_def["time-splitter"]))
+                        self.add_regex(type_def[2])
 
                     elif node_def['type'] == 'timedelta':
                             type_def = (self.dtc.typeTimeDelta, )
@@ -923,6 +1695,7 @@ class DataDef_Convert():
                         type_def = (self.dtc.typeDate,
                             data_value('date-sequence', node_def, list, self.cdata_def["date-sequence"]),
                             data_value('date-splitter', node_def, str, self.cdata_def["date-splitter"]))
+                        self.add_regex(type_def[2])
 
                     elif node_def['type'] == 'datestamp':
                         if is_data_value('multiplier', node_def, int) and node_def['multiplier'] != 0:
@@ -962,6 +1735,7 @@ class DataDef_Convert():
                         type_def = (self.dtc.typeStringList,
                             data_value('str-list-splitter', node_def, str, self.cdata_def["str-list-splitter"]),
                             data_value("omit-empty-list-items", node_def, bool, False))
+                        self.add_regex(type_def[1])
 
                     elif node_def['type'] == 'list':
                         type_def = (self.dtc.typeList, )
@@ -1047,26 +1821,33 @@ class DataDef_Convert():
                         sel_node[self.dtc.selPos[self.dtc.selPathLink]] = inode["path"]
 
                 else:
-                    for ttext, dtsel, tree_type, singleval in (
-                            ("key", self.dtc.selKey, "json", True),
-                            ("tag", self.dtc.selTag, "html", True),
-                            ("keys", self.dtc.selKeys, "json", False),
-                            ("tags", self.dtc.selTags, "html", False)):
+                    for ttext, dtsel, tree_type, singleval, ltype in (
+                            ("key", self.dtc.selKey, "json", True, None),
+                            ("tag", self.dtc.selTag, "html", True, 'lower'),
+                            ("keys", self.dtc.selKeys, "json", False, None),
+                            ("tags", self.dtc.selTags, "html", False, 'lower')):
                         if ttext in inode.keys() and self.ddtype in (tree_type, ""):
                             self.ddtype = tree_type
                             sel_node[1] = dtsel
                             if singleval:
-                                sel_node[self.dtc.selPos[dtsel]] = convert_value_link(inode[ttext])
+                                sel_node[self.dtc.selPos[dtsel]] = convert_match_list([inode[ttext]], ttext, ltype)
 
                             else:
-                                sel_node[self.dtc.selPos[dtsel]] = convert_value_list(inode[ttext])
+                                sel_node[self.dtc.selPos[dtsel]] = convert_match_list(inode[ttext], ttext, ltype)
 
                             break
 
                 # Check when allowed for an Index statement
                 if sel_node[1] in (self.dtc.selNone, self.dtc.selTag, self.dtc.selTags, self.dtc.selKeys) and "index" in inode.keys():
                     sel_node[1] += self.dtc.selIndex
-                    sel_node[self.dtc.selPos[self.dtc.selIndex]] = convert_value_list(inode["index"], True)
+                    ilist = []
+                    for v in convert_value_list(inode["index"], True):
+                        if v[0] == self.dtc.valValue:
+                            v = (self.dtc.valValue, self.convert_match_value(v[1], 'index', 'int'), 0)
+
+                        ilist.append(v)
+
+                    sel_node[self.dtc.selPos[self.dtc.selIndex]] = tuple(ilist)
 
                 # Check when allowed for secundary statements
                 if sel_node[1] not in (self.dtc.selNone, self.dtc.selPathParent, self.dtc.selPathRoot, self.dtc.selPathLink):
@@ -1076,22 +1857,22 @@ class DataDef_Convert():
                         if ttext in inode.keys() and self.ddtype in ("html", ""):
                             self.ddtype = "html"
                             sel_node[1] += dtsel
-                            sel_node[self.dtc.selPos[dtsel]] = convert_value_list(inode[ttext])
+                            sel_node[self.dtc.selPos[dtsel]] = convert_match_list(inode[ttext], ttext, 'lower')
 
-                    for ttext, dtsel, tree_type in (
-                            ("childkeys", self.dtc.selChildKeys, "json"),
-                            ("attrs", self.dtc.selAttrs, "html"),
-                            ("notchildkeys", self.dtc.selNotChildKeys, "json"),
-                            ("notattrs", self.dtc.selNotAttrs, "html")):
+                    for ttext, dtsel, tree_type, ltype in (
+                            ("childkeys", self.dtc.selChildKeys, "json", None),
+                            ("attrs", self.dtc.selAttrs, "html", 'str'),
+                            ("notchildkeys", self.dtc.selNotChildKeys, "json", None),
+                            ("notattrs", self.dtc.selNotAttrs, "html", 'str')):
                         if ttext in inode.keys() and self.ddtype in (tree_type, ""):
                             if isinstance(inode[ttext], dict):
-                                sel_node[self.dtc.selPos[dtsel]] = (convert_attr_dict(inode[ttext]), )
+                                sel_node[self.dtc.selPos[dtsel]] = (convert_attr_dict(inode[ttext], ttext, ltype), )
 
                             elif isinstance(inode[ttext], (list, tuple)):
                                 dtt = []
                                 for ldict in inode[ttext]:
                                     if isinstance(ldict, dict):
-                                        dtt.append(convert_attr_dict(ldict))
+                                        dtt.append(convert_attr_dict(ldict, ttext, ltype))
 
                                 sel_node[self.dtc.selPos[dtsel]] = tuple(dtt)
 
@@ -1129,6 +1910,27 @@ class DataDef_Convert():
 
             return tuple(dpath)
 
+    def convert_match_value(self, value, valuetype = '', ltype = None):
+        # Give a literal matchvalue the form it is matched on, as DATAnode.get_value does on a linkvalue
+        if value == None:
+            return None
+
+        try:
+            if ltype == 'int':
+                return int(value)
+
+            elif ltype == 'lower':
+                return unicode(value).lower()
+
+            elif ltype == 'str':
+                return unicode(value)
+
+            return value
+
+        except:
+            self.warn('Invalid %s matchvalue "%s" requested.' % (valuetype, value), dtConversionWarning, 2, 3)
+            return None
+
     def convert_link_def(self, link_def, key, maxid, init_errors = True):
         def convert_funcid(ldict, key, maxid):
             if ldict['funcid'] < 100 and not ldict['funcid'] in self.known_linkid:
@@ -1149,7 +1951,11 @@ class DataDef_Convert():
                 else:
                     funcdata.append((self.dtc.linkValue, fd))
 
-            return check_extras([self.dtc.linkFuncID, (ldict["funcid"], funcdata)], ldict, key)
+            link_node = check_extras([self.dtc.linkFuncID, (ldict["funcid"], funcdata)], ldict, key)
+            if ldict["funcid"] in self.fold_linkid:
+                return self.fold_link_function(link_node)
+
+            return link_node
 
         def convert_varid(ldict, key, maxid):
             if 0 <= ldict["varid"] <= maxid:
@@ -1177,6 +1983,7 @@ class DataDef_Convert():
             if is_data_value('regex', ldict, str):
                 link_node[0] += self.dtc.linkhasRegex
                 link_node[self.dtc.linkPos[self.dtc.linkhasRegex]] = ldict['regex']
+                self.add_regex(ldict['regex'], re.DOTALL)
 
             if is_data_value('type', ldict, str):
                 if ldict['type'] == "string":
@@ -1297,6 +2104,7 @@ class DataDef_Convert():
                 self.ddtype = 'html'
 
             self.cdata_def = {}
+            self.regex_list = set()
             self.cdata_def["datetimestring"] = self.data_value("datetimestring", str, default = u"%Y-%m-%d %H:%M:%S")
             self.cdata_def["date-sequence"] = self.data_value("date-sequence", list, default = ["y","m","d"])
             self.cdata_def["date-splitter"] = self.data_value("date-splitter", str, default = '-')
@@ -1322,8 +2130,16 @@ class DataDef_Convert():
 
             self.cdata_def["str-list-splitter"] = self.data_value("str-list-splitter", str, default = '\|')
             self.cdata_def["value-filters"] = self.data_value("value-filters", dict)
+            self.cdata_def["transliteration"] = self.convert_transliteration(self.data_value("transliteration", dict))
             self.cdata_def["text_replace"] = self.data_value("text_replace", list)
+            for subset in self.cdata_def["text_replace"]:
+                if isinstance(subset, list) and len(subset) >= 2:
+                    self.add_regex(subset[0], re.DOTALL)
+
             self.cdata_def["unquote_html"] = self.data_value("unquote_html", list)
+            for ut in self.cdata_def["unquote_html"]:
+                self.add_regex(ut, re.DOTALL)
+
             self.cdata_def["enclose-with-html-tag"] = self.data_value("enclose-with-html-tag", bool, default = False)
             self.cdata_def["autoclose-tags"] = self.data_value("autoclose-tags", list)
             if include_url:
@@ -1444,11 +2260,101 @@ class DataDef_Convert():
                 for k, v in self.data_value("values", dict).items():
                     self.cdata_def["values"][k] = self.convert_link_def(v, k, value_count,False)
 
+                if len(self.cdata_def["values"]) > 0:
+                    self.cdata_def["used-varids"] = self.used_varids(self.cdata_def["values"].values())
+
             if file_name != None:
                 self.store_cdata_def(file_name)
 
             return self.errorcode
 
+    def fold_link_function(self, link_node):
+        # Evaluate a built-in link function whose data are all constants and store the result
+        # as (funcid, funcdata, value), marked with linkFolded. Custom functions (> 99) can
+        # have side effects and are never folded. Data that would give a warning are left
+        # to give it on extraction.
+        def link_warning(text, severity = 4):
+            raise ValueError(text)
+
+        extras = self.dtc.linkhasRegex + self.dtc.linkhasType + self.dtc.linkhasCalc + \
+            self.dtc.linkhasMax + self.dtc.linkhasMin
+        empty_values = data_value("empty-values", self.cdata_def, list, [None, ''])
+        data = []
+        for fd in link_node[1][1]:
+            if fd[0] == self.dtc.linkValue:
+                data.append(fd[1])
+
+            elif (fd[0] & self.dtc.linkFolded) and not (fd[0] & extras):
+                # What process_link_function in link_values would return for it
+                data.append(None if fd[1][2] in empty_values else fd[1][2])
+
+            else:
+                return link_node
+
+        default = link_node[self.dtc.linkPos[self.dtc.linkhasDefault]] if len(link_node) > 2 else None
+        try:
+            value = builtin_link_function(link_node[1][0], data, default, link_warning)
+
+        except:
+            return link_node
+
+        return (link_node[0] + self.dtc.linkFolded, (link_node[1][0], link_node[1][1], value)) + link_node[2:]
+
+    def used_varids(self, link_defs):
+        # The varids the converted link_defs refer to, directly or through "funcid" data lists
+        varids = set()
+        for link_node in link_defs:
+            lact = link_node[0] & self.dtc.linkGroup
+            if lact == self.dtc.linkVarID:
+                varids.add(link_node[1][0])
+
+            elif lact == self.dtc.linkFuncID:
+                varids.update(self.used_varids(link_node[1][1]))
+
+        return frozenset(varids)
+
+    def convert_transliteration(self, tdef):
+        # Collect the per language and the explicit additions to the ascii transliteration
+        table = {}
+        for lang in data_value("languages", tdef, list):
+            if lang in self.dtc.asciiLanguages.keys():
+                table.update(self.dtc.asciiLanguages[lang])
+
+            else:
+                self.warn('Unknown transliteration language: "%s"' % (lang, ), dtConversionWarning, 2)
+
+        for k, v in data_value("table", tdef, dict).items():
+            try:
+                if len(k) != 1 or not isinstance(v, (str, unicode)):
+                    raise ValueError
+
+                v.encode('ascii')
+                table[k.lower()] = v
+
+            except:
+                self.warn('Invalid transliteration: %r: %r. It must map one character on an ascii string' \
+                    % (k, v), dtConversionWarning, 2)
+
+        return table
+
+    def add_regex(self, pattern, flags = 0):
+        # Compile a regex used by the data_def into the regex_cache
+        # Invalid patterns are left for the warnings at extraction time
+        if not isinstance(pattern, (str, unicode)):
+            return
+
+        try:
+            regex_cache.compile(pattern, flags)
+            self.regex_list.add((pattern, flags))
+
+        except re.error:
+            pass
+
+    def regex_count(self):
+        # The number of distinct compiled patterns in this data_def
+        with self.tree_lock:
+            return len(self.regex_list)
+
     def write_cdata_def(self, output = sys.stdout, data = None):
         with self.tree_lock:
             if data == None:
@@ -1461,48 +2367,361 @@ class DataDef_Convert():
                 output.write(u'%s\n' % data)
 
     def store_cdata_def(self, filename, data = None):
+        # Write to a temporary file next to filename and rename it, so a reader never sees a partial file
         with self.tree_lock:
             if data == None:
                 data = self.cdata_def
 
+            tmpname = None
             try:
-                pickle.dump(data, open(filename, 'w'), 2)
+                fd, tmpname = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(filename)),
+                        prefix = '.%s.' % os.path.basename(filename))
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(encode_cdata_def(data))
+
+                try:
+                    os.rename(tmpname, filename)
+
+                except OSError:
+                    # Windows does not replace an existing file
+                    os.remove(filename)
+                    os.rename(tmpname, filename)
+
+                return True
 
             except:
                 self.warn('Failed to store the converted file as: "%s"' % ( filename, ), dtConversionWarning, 1)
+                if tmpname != None and os.path.exists(tmpname):
+                    os.remove(tmpname)
 
-    def dtversion(self):
-        return tuple(version()[1:4])
+                return False
 
-    def simplefilter(self, action, category=Warning, lineno=0, append=0, severity=0):
+    def load_cdata_def(self, filename):
+        # Return a stored converted data_def or None if it is unreadable or of another version
         with self.tree_lock:
-            sys.modules['DataTreeGrab']._warnings.simplefilter(action, category, lineno, append, self.caller_id, severity)
+            try:
+                with open(filename, 'rb') as f:
+                    cdata_def = decode_cdata_def(f.read())
 
-    def warn(self, message, category, severity, stacklevel = 2):
-        sys.modules['DataTreeGrab']._warnings.warn(message, category, self.caller_id, severity, stacklevel)
+            except:
+                self.warn('Failed to load the converted file: "%s"' % ( filename, ), dtConversionWarning, 2)
+                return None
 
-    def is_data_value(self, searchpath, dtype = None, empty_is_false = False):
-        return is_data_value(searchpath, self.data_def, dtype, empty_is_false)
+            if not is_data_value("dtversion", cdata_def, tuple):
+                self.warn('The file: "%s" does not contain a converted data_def' % ( filename, ), dtConversionWarning, 2)
+                return None
 
-    def data_value(self, searchpath, dtype = None, default = None):
-        return data_value(searchpath, self.data_def, dtype, default)
+            if cdata_def["dtversion"] != self.dtversion():
+                return None
 
-# end DataDef_Convert
+            return cdata_def
 
-class NULLnode():
-    value = None
+    def cdata_def_key(self, data_def, ptype = "", include_url = True, include_links = True):
+        # A hash over the raw data_def, the conversion arguments and dtversion
+        # or None if the data_def is not JSON serializable
+        try:
+            raw = json.dumps([data_def, ptype, include_url, include_links, self.dtversion()], sort_keys = True)
 
-# end NULLnode
+        except (TypeError, ValueError):
+            return None
 
-class DATAnode():
-    """Basic DataNode functionality to be detailed in JSONnode and HTMLnode"""
-    def __init__(self, dtree, parent = None):
-        self.node_lock = RLock()
-        with self.node_lock:
-            self.dtc = DataTreeConstants()
-            self.children = []
-            self.dtree = dtree
-            self.parent = parent
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def convert_cached(self, data_def, cache_dir, ptype = "", include_url = True, include_links = True):
+        # Like convert_data_def, but reuse the conversion stored in cache_dir if present.
+        # Only conversions without any error are stored. A stored conversion from another
+        # dtversion is never found, as the version is part of the key.
+        with self.tree_lock:
+            key = self.cdata_def_key(data_def, ptype, include_url, include_links)
+            if key == None or cache_dir == None:
+                return self.convert_data_def(data_def, ptype, include_url, include_links)
+
+            file_name = os.path.join(cache_dir, '%s.cdd' % (key, ))
+            if os.path.isfile(file_name):
+                cdata_def = self.load_cdata_def(file_name)
+                if cdata_def != None:
+                    self.data_def = data_def
+                    self.cdata_def = cdata_def
+                    self.ddtype = cdata_def["dttype"]
+                    self.errorcode = dte.dtDataDefOK
+                    return self.errorcode
+
+            self.convert_data_def(data_def, ptype, include_url, include_links)
+            if self.errorcode == dte.dtDataDefOK:
+                try:
+                    if not os.path.isdir(cache_dir):
+                        os.makedirs(cache_dir)
+
+                    self.store_cdata_def(file_name)
+
+                except OSError:
+                    self.warn('Unable to create the cache directory: "%s"' % ( cache_dir, ), dtConversionWarning, 2)
+
+            return self.errorcode
+
+    def convert_directory(self, source_dir, target_dir = None, workers = 1, ptype = "", include_url = True, include_links = True):
+        # Convert every "*.json" data_def in source_dir in a pool of worker processes
+        # and store each result as "<name>.cdd" in target_dir (default source_dir).
+        # Returns a summary with per data_def the errorcode, the warnings and the conversion time
+        with self.tree_lock:
+            if target_dir == None:
+                target_dir = source_dir
+
+            summary = {"converted": 0, "failed": 0, "time": 0.0, "defs": OrderedDict()}
+            try:
+                file_list = sorted([f for f in os.listdir(source_dir) if f.lower().endswith('.json')])
+                if not os.path.isdir(target_dir):
+                    os.makedirs(target_dir)
+
+            except OSError:
+                self.warn('Unable to access the directories: "%s", "%s"' % (source_dir, target_dir), dtConversionWarning, 1)
+                return summary
+
+            jobs = [(os.path.join(source_dir, f), os.path.join(target_dir, '%s.cdd' % (os.path.splitext(f)[0], )),
+                    ptype, include_url, include_links, self.caller_id) for f in file_list]
+            if len(jobs) == 0:
+                return summary
+
+        # Make sure no other thread holds a lock the workers need while forking
+        # This converter lock nests within the registry lock, so it is not held here
+        with _ForkLocks(ddconv_lock = self.tree_lock):
+            pool = multiprocessing.Pool(max(1, min(workers, len(jobs))), _reset_fork_locks)
+
+        try:
+            results = pool.map(_convert_def_file, jobs, 1)
+
+        finally:
+            pool.close()
+            pool.join()
+
+        for f, result in zip(file_list, results):
+            summary["defs"][f] = result
+            summary["time"] += result["time"]
+            if result["errorcode"] == dte.dtDataDefOK and result["output"] != None:
+                summary["converted"] += 1
+
+            else:
+                summary["failed"] += 1
+
+        return summary
+
+    def dtversion(self):
+        return tuple(version()[1:4])
+
+    def simplefilter(self, action, category=Warning, lineno=0, append=0, severity=0):
+        with self.tree_lock:
+            sys.modules['DataTreeGrab']._warnings.simplefilter(action, category, lineno, append, self.caller_id, severity)
+
+    def warn(self, message, category, severity, stacklevel = 2):
+        sys.modules['DataTreeGrab']._warnings.warn(message, category, self.caller_id, severity, stacklevel)
+
+    def is_data_value(self, searchpath, dtype = None, empty_is_false = False):
+        return is_data_value(searchpath, self.data_def, dtype, empty_is_false)
+
+    def data_value(self, searchpath, dtype = None, default = None):
+        return data_value(searchpath, self.data_def, dtype, default)
+
+# end DataDef_Convert
+
+def _convert_def_file(job):
+    """
+    Convert one data_def file in a convert_directory worker process
+    and return its errorcode, warnings and conversion time
+    """
+    source, target, ptype, include_url, include_links, caller_id = job
+    # The worker owns a copy of the warnings framework, so collect them locally
+    warnings = sys.modules['DataTreeGrab']._warnings
+    warnings.warngoal = Queue()
+    result = {"errorcode": dte.dtDataDefOK, "errortext": "", "warnings": [], "time": 0.0, "output": None}
+    start = time.time()
+    try:
+        try:
+            with open(source, 'rb') as f:
+                data_def = json.loads(f.read().decode('utf-8'))
+
+        except (IOError, ValueError) as e:
+            result["errorcode"] = dte.dtJSONerror
+            warnings.warn('Unable to read the data_def: "%s": %s' % (source, e), dtConversionWarning, caller_id, 1)
+
+        else:
+            cdef = DataDef_Convert(caller_id = caller_id, warnaction = None)
+            result["errorcode"] = cdef.convert_data_def(data_def, ptype, include_url, include_links)
+            if cdef.store_cdata_def(target):
+                result["output"] = target
+
+    except:
+        result["errorcode"] = dte.dtUnknownError
+        result["warnings"].append(traceback.format_exc())
+
+    result["time"] = time.time() - start
+    # The data_def errorcodes are flags above the first 4 bits
+    ecode = result["errorcode"]
+    etexts = [dte.errortext(ecode & 15)] if ecode & 15 or ecode == 0 else []
+    etexts.extend([dte.errortext(flag) for flag in sorted(dte.dtErrorTexts.keys()) if flag > 15 and ecode & flag])
+    result["errortext"] = ', '.join(etexts)
+    while True:
+        try:
+            result["warnings"].append(warnings.warngoal.get_nowait()[0])
+
+        except Empty:
+            break
+
+    return result
+# end _convert_def_file()
+
+class FrozenDict(dict):
+    """A dict in a shared converted data_def, that refuses to be changed"""
+    def _refuse(self, *args, **kwargs):
+        raise TypeError('A shared converted data_def can not be changed')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _refuse
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self), ))
+
+# end FrozenDict()
+
+class FrozenList(list):
+    """A list in a shared converted data_def, that refuses to be changed"""
+    def _refuse(self, *args, **kwargs):
+        raise TypeError('A shared converted data_def can not be changed')
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _refuse
+    append = extend = insert = pop = remove = reverse = sort = _refuse
+
+    def __reduce__(self):
+        return (FrozenList, (list(self), ))
+
+# end FrozenList()
+
+def freeze_cdata_def(item):
+    """Return a deep copy of a converted data_def that can not be changed"""
+    if isinstance(item, dict):
+        return FrozenDict([(k, freeze_cdata_def(v)) for k, v in item.items()])
+
+    elif isinstance(item, list):
+        return FrozenList([freeze_cdata_def(v) for v in item])
+
+    elif isinstance(item, tuple):
+        return tuple([freeze_cdata_def(v) for v in item])
+
+    elif isinstance(item, set):
+        return frozenset(item)
+
+    return item
+# end freeze_cdata_def()
+
+class DataDefRegistry():
+    """
+    A process wide store of frozen converted data_defs, keyed on the hash of the
+    raw data_def, the conversion arguments and dtversion. It is used by the shells
+    and trees created with shared_def, so an identical data_def is only converted
+    and held once. A lookup does not lock. Conversions with errors are not stored,
+    so their warnings are given again on every use.
+    """
+    def __init__(self):
+        self.registry_lock = RLock()
+        self.defs = {}
+        self.misses = 0
+
+    def get(self, ddconv, data_def, cache_dir = None, ptype = "", include_url = True, include_links = True):
+        # Return (errorcode, cdata_def) using ddconv for a conversion
+        key = ddconv.cdata_def_key(data_def, ptype, include_url, include_links)
+        # A dict lookup is atomic and a stored def is never changed
+        cdata_def = self.defs.get(key) if key != None else None
+        if cdata_def != None:
+            return (dte.dtDataDefOK, cdata_def)
+
+        with self.registry_lock:
+            cdata_def = self.defs.get(key) if key != None else None
+            if cdata_def != None:
+                return (dte.dtDataDefOK, cdata_def)
+
+            self.misses += 1
+            if cache_dir != None:
+                errorcode = ddconv.convert_cached(data_def, cache_dir, ptype, include_url, include_links)
+
+            else:
+                errorcode = ddconv.convert_data_def(data_def, ptype, include_url, include_links)
+
+            if errorcode != dte.dtDataDefOK or key == None:
+                return (errorcode, ddconv.cdata_def)
+
+            cdata_def = freeze_cdata_def(ddconv.cdata_def)
+            self.defs[key] = cdata_def
+            return (errorcode, cdata_def)
+
+    def clear(self):
+        with self.registry_lock:
+            self.defs = {}
+            self.misses = 0
+
+    def stats(self):
+        with self.registry_lock:
+            return {"misses": self.misses,
+                    "size": len(self.defs)}
+
+# end DataDefRegistry()
+data_def_registry = DataDefRegistry()
+
+class _ForkLocks():
+    """
+    Holds the given locks and the module level locks while worker processes are
+    forked, so no other thread holds one of them in the copy of the process. They
+    are taken in the order they nest: the lock of the forking shell or tree, the
+    data_def_registry lock, the lock of its DataDef_Convert, the path_def_cache
+    and regex_cache locks and last the warnings lock.
+    """
+    def __init__(self, tree_lock = None, ddconv_lock = None):
+        self.locks = [tree_lock, data_def_registry.registry_lock, ddconv_lock,
+            path_def_cache.cache_lock, regex_cache.cache_lock, sys.modules['DataTreeGrab']._warnings.warn_lock]
+        self.locks = [lock for lock in self.locks if lock != None]
+
+    def __enter__(self):
+        for lock in self.locks:
+            lock.acquire()
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.locks):
+            lock.release()
+
+# end _ForkLocks()
+
+def _reset_fork_locks():
+    """
+    Replace the module level locks in a forked worker process, as a pool can fork
+    a new worker while another thread of the parent holds one of them
+    """
+    data_def_registry.registry_lock = RLock()
+    path_def_cache.cache_lock = RLock()
+    regex_cache.cache_lock = RLock()
+    if sys.modules['DataTreeGrab']._warnings != None:
+        sys.modules['DataTreeGrab']._warnings.warn_lock = RLock()
+
+# end _reset_fork_locks()
+
+class NULLnode():
+    value = None
+
+# end NULLnode
+
+class DeferredValue():
+    # A found value of which the typing is left to DATAtree.batch_type
+    def __init__(self, value, type_def):
+        self.value = value
+        self.type_def = type_def
+
+# end DeferredValue
+
+class DATAnode():
+    """Basic DataNode functionality to be detailed in JSONnode and HTMLnode"""
+    def __init__(self, dtree, parent = None):
+        self.node_lock = RLock()
+        with self.node_lock:
+            self.dtc = dtc
+            self.children = []
+            self.dtree = dtree
+            self.parent = parent
             self.value = None
             self.child_index = 0
             self.level = 0
@@ -1529,61 +2748,59 @@ class DATAnode():
             node.child_index = len(self.children)
             self.children.append(node)
 
-    def get_children(self, path_def = None, links=None):
+    def get_children(self, path_def = None, links=None, trace = False):
+        # Walk path_def from this node and return the found nodes.
+        # With trace the show_result output is printed on the way.
         d_def = path_def if isinstance(path_def, tuple) else (path_def, )
         nm = None
         childs = []
-        def match_node(node, sel_node=self.dtc.selNone):
-            # check through the HTML/JSON specific functions
-            nfound = node.match_node(node_def = d_def[0], link_values=links["values"], sel_node=sel_node)
-            if nfound  and sel_node in (self.dtc.selNone, self.dtc.selTag, self.dtc.selTags, self.dtc.selKeys) \
-                and (d_def[0][1] & self.dtc.selIndex):
-                nfound = node.check_index(d_def[0][self.dtc.selPos[self.dtc.selIndex]], links["values"])
-
-            if nfound:
-                if self.dtree.show_result:
-                    self.dtree.print_text(u'    found node %s;\n%s' % \
-                        (node.print_node(), node.print_node_def(d_def[0])))
-
-            return nfound
-
         while True:
             if len(d_def) == 0:
-                d_def = self.dtc.emptyNodeDef
                 childs = [(self, None)]
                 break
 
             ndef_type = (d_def[0][0] & self.dtc.isGroup)
             if ndef_type == self.dtc.isNodeSel:
                 sel_node = (d_def[0][1] & self.dtc.selMain)
+                m_def = self.resolve_node_def(d_def[0], links["values"])
                 if sel_node == self.dtc.selPathLink:
-                    if is_data_value(["nodes", d_def[0][2]], links, DATAnode) and match_node(links["nodes"][d_def[0][2]], sel_node):
-                        childs = links["nodes"][d_def[0][2]].get_children(path_def = d_def[1:], links=links)
+                    clist = [links["nodes"][d_def[0][2]]] if is_data_value(["nodes", d_def[0][2]], links, DATAnode) else []
 
                 elif sel_node == self.dtc.selPathRoot:
-                    if match_node(self.root, sel_node):
-                        childs = self.root.get_children(path_def = d_def[1:], links=links)
+                    clist = [self.root]
 
                 elif sel_node == self.dtc.selPathParent:
-                    if match_node(self.parent, sel_node):
-                        childs = self.parent.get_children(path_def = d_def[1:], links=links)
+                    clist = [self.parent]
 
                 else:
-                    clist = self.children[:]
+                    if (d_def[0][1] & self.dtc.selIndex):
+                        # Only look at the children on the requested positions
+                        clist = [self.children[i] for i in \
+                            self.get_child_positions(d_def[0][self.dtc.selPos[self.dtc.selIndex]], links["values"])]
+
+                    else:
+                        clist = self.children[:]
+
                     if (d_def[0][0] & self.dtc.getLast):
                         clist.reverse()
 
-                    for item in clist:
-                        if match_node(item, sel_node):
-                            childs = extend_list(childs, item.get_children(path_def = d_def[1:], links=links))
-                            if (d_def[0][0] & self.dtc.getOnlyOne) and len(childs) > 0:
-                                break
+                only_one = bool(d_def[0][0] & self.dtc.getOnlyOne)
+                lvalues = links["values"]
+                for item in clist:
+                    if item.match_node(node_def = m_def, link_values=lvalues, sel_node=sel_node):
+                        if trace:
+                            self.dtree.print_text(u'    found node %s;\n%s' % \
+                                (item.print_node(), item.print_node_def(d_def[0])))
+
+                        childs = extend_list(childs, item.get_children(d_def[1:], links, trace))
+                        if only_one and len(childs) > 0:
+                            break
 
                 break
 
             elif ndef_type == self.dtc.isValue:
                 val = self.find_value(d_def[0])
-                if self.dtree.show_result:
+                if trace:
                     if isinstance(val, (str,unicode)):
                         self.dtree.print_text(u'    found nodevalue (="%s"): %s\n%s' % \
                             (val, self.print_node(), self.print_node_def(d_def[0])))
@@ -1602,7 +2819,7 @@ class DATAnode():
                 d_def = d_def[1:]
 
             elif ndef_type == self.dtc.isNodeLink:
-                if self.dtree.show_result:
+                if trace:
                     self.dtree.print_text(self.print_node_def(d_def[0]))
 
                 links["nodes"][d_def[0][1]] = self
@@ -1620,7 +2837,7 @@ class DATAnode():
             # This is an end node, so we store link values to use on further searches
             self.end_links["values"] = links["values"].copy()
             self.end_links["nodes"] = links["nodes"].copy()
-            if self.dtree.show_result:
+            if trace:
                 self.dtree.print_text(u'  adding node (= %s) %s' % (childs[0][1], self.print_node()))
 
         if nm == None:
@@ -1629,6 +2846,68 @@ class DATAnode():
         else:
             return [{nm: childs}]
 
+    def resolve_node_def(self, node_def, link_values):
+        # Merge the current linkvalues into the pre-resolved match lists of a node selection
+        def resolve_match_list(mlist):
+            if len(mlist[self.dtc.mlLinks]) == 0:
+                return mlist
+
+            vlist = list(mlist[self.dtc.mlConst])
+            for v in mlist[self.dtc.mlLinks]:
+                vlist.append(self.get_value(v, link_values, mlist[self.dtc.mlName], mlist[self.dtc.mlType])[0])
+
+            anyvalue = bool(len(mlist[self.dtc.mlValues]) == 1 and vlist[0] == None)
+            return (match_set(vlist), (), anyvalue) + mlist[self.dtc.mlName:]
+
+        def resolve_attr_sets(alist):
+            rlist = []
+            for cd in alist:
+                rlist.append(tuple([(ck[0], ck[1], resolve_match_list(ck[2])) for ck in cd]))
+
+            return tuple(rlist)
+
+        if not (node_def[0] & self.dtc.hasValueLinks):
+            return node_def
+
+        m_def = list(node_def)
+        if (node_def[1] & self.dtc.selMain) in (self.dtc.selKey, self.dtc.selTag, self.dtc.selKeys):
+            m_def[2] = resolve_match_list(node_def[2])
+
+        for dtsel in (self.dtc.selText, self.dtc.selTail):
+            if node_def[1] & dtsel:
+                m_def[self.dtc.selPos[dtsel]] = resolve_match_list(node_def[self.dtc.selPos[dtsel]])
+
+        for dtsel in (self.dtc.selAttrs, self.dtc.selNotAttrs):
+            if node_def[1] & dtsel:
+                m_def[self.dtc.selPos[dtsel]] = resolve_attr_sets(node_def[self.dtc.selPos[dtsel]])
+
+        return tuple(m_def)
+
+    def get_child_positions(self, ilist, link_values):
+        # Return in order the child positions selected by an index list
+        # The literal indexes are converted to int in DataDef_Convert
+        ccount = len(self.children)
+        positions = set()
+        for v in ilist:
+            if v[0] == self.dtc.valValue:
+                il = (v[1], 0)
+
+            else:
+                il = self.get_value(v, link_values, 'index', 'int')
+
+            if (il[1] & self.dtc.valLinkPrevious):
+                if il[0] != None:
+                    positions.update(range(min(max(il[0], 0), ccount)))
+
+            elif (il[1] & self.dtc.valLinkNext):
+                # Any index is higher then an unresolved link
+                positions.update(range(0 if il[0] == None else max(il[0] + 1, 0), ccount))
+
+            elif il[0] != None and 0 <= il[0] < ccount:
+                positions.add(il[0])
+
+        return sorted(positions)
+
     def check_index(self, ilist, link_values):
         for v in ilist:
             il = self.get_value(v, link_values, 'index', 'int')
@@ -1739,6 +3018,9 @@ class DATAnode():
             sv = node_def[self.dtc.getPos[self.dtc.hasDefault]]
 
         if node_def[0] & self.dtc.hasType:
+            if node_def[0] & self.dtc.deferType:
+                return DeferredValue(sv, node_def[self.dtc.getPos[self.dtc.hasType]])
+
             sv = self.dtree.calc_type(sv, node_def[self.dtc.getPos[self.dtc.hasType]])
 
         if node_def[0] & self.dtc.isMemberOff:
@@ -1748,7 +3030,7 @@ class DATAnode():
 
         # Make sure a string is unicode and free of HTML entities
         if isinstance(sv, (str, unicode)):
-            sv = re.sub('\n','', re.sub('\r','', self.dtree.un_escape(unicode(sv)))).strip()
+            sv = self.dtree.normalize_text(sv)
 
         return sv
 
@@ -1878,7 +3160,7 @@ class DATAnode():
 
             elif type_def[0] == self.dtc.typeTime:
                 return '%s using %s hour clock and splitting on "%s"' % \
-                    (self.dtc.const_text('type_name', type_def[0]), type_def[1], type_def[2])
+                    (self.dtc.const_text('type_name', type_def[0]), type_def[1][0], type_def[2])
 
             elif type_def[0] == self.dtc.typeDate:
                 return "%s using %s" % (self.dtc.const_text('type_name', type_def[0]), type_def[1])
@@ -1972,7 +3254,11 @@ class HTMLnode(DATAnode):
         self.tag = u''
         self.text = u''
         self.tail = u''
+        # The case-folded text and tail are set by HTMLtree.fold_case once parsing is done
+        self.text_lower = u''
+        self.tail_lower = u''
         self.attributes = {}
+        self.attributes_lower = {}
         self.attr_names = []
         DATAnode.__init__(self, dtree, parent)
         with self.node_lock:
@@ -1987,9 +3273,11 @@ class HTMLnode(DATAnode):
                     for a in data[1]:
                         if isinstance(a[1], (str, unicode)):
                             self.attributes[a[0].lower().strip()] = a[1].strip()
+                            self.attributes_lower[a[0].lower().strip()] = a[1].strip().lower()
 
                         else:
                             self.attributes[a[0].lower().strip()] = a[1]
+                            self.attributes_lower[a[0].lower().strip()] = a[1]
 
                     if 'class' in self.attributes.keys():
                         self.attr_names.append('class')
@@ -2008,8 +3296,9 @@ class HTMLnode(DATAnode):
         return None
 
     def is_attribute(self, name, value = None):
-        if name.lower() in self.attributes.keys():
-            if value == None or value.lower() == self.attributes[name.lower()].lower():
+        name = name.lower()
+        if name in self.attributes:
+            if value == None or value.lower() == self.attributes_lower[name]:
                 return True
 
         return False
@@ -2031,7 +3320,7 @@ class HTMLnode(DATAnode):
             if not isinstance(attributes,list):
                 attributes = []
 
-            if tag.lower() in (None, self.tag.lower()):
+            if tag.lower() in (None, self.tag):
                 if attributes == None:
                     return True
 
@@ -2047,23 +3336,25 @@ class HTMLnode(DATAnode):
             else:
                 return False
 
+        # The match lists in node_def have been resolved in DATAnode.resolve_node_def
         if sel_node == self.dtc.selTag:
-            if not self.get_value(node_def[self.dtc.selPos[self.dtc.selTag]], link_values, 'tag', 'lower')[0] in (None, self.tag.lower()):
+            mlist = node_def[self.dtc.selPos[self.dtc.selTag]]
+            if not (mlist[self.dtc.mlAny] or self.tag in mlist[self.dtc.mlConst]):
                 # The requested tag doesn't matches
                 return False
 
         elif sel_node == self.dtc.selTags:
-            if not self.tag.lower() in self.get_value_list(node_def[self.dtc.selPos[self.dtc.selTags]], link_values, 'tag', 'lower'):
+            if not self.tag in node_def[self.dtc.selPos[self.dtc.selTags]][self.dtc.mlConst]:
                 # This tag isn't in the list with requested tags
                 return False
 
         if (node_def[1] & self.dtc.selText):
-            if not self.text.lower() in self.get_value_list(node_def[self.dtc.selPos[self.dtc.selText]], link_values, 'text', 'lower'):
+            if not self.text_lower in node_def[self.dtc.selPos[self.dtc.selText]][self.dtc.mlConst]:
                 # This text isn't in the list with requested values
                 return False
 
         if (node_def[1] & self.dtc.selTail):
-            if not self.tail.lower() in self.get_value_list(node_def[self.dtc.selPos[self.dtc.selTail]], link_values, 'tail', 'lower'):
+            if not self.tail_lower in node_def[self.dtc.selPos[self.dtc.selTail]][self.dtc.mlConst]:
                 # This tailtext isn't in the list with requested values
                 return False
 
@@ -2072,14 +3363,14 @@ class HTMLnode(DATAnode):
                 # For each set
                 for ck in cd:
                     # For each attribute ck[0]
-                    if self.is_attribute(ck[0]):
+                    if ck[0] in self.attributes:
                         # The attribute is there
-                        alist = self.get_value_list(ck[2], link_values, 'attribute', 'str')
+                        alist = ck[2][self.dtc.mlConst]
                         if ck[1] == self.dtc.attrNot and self.attributes[ck[0]] not in alist:
                             # Without a forbidden value
                             continue
 
-                        elif ck[1] == self.dtc.attr and ((len(alist) == 1 and alist[0] == None) or self.attributes[ck[0]] in alist):
+                        elif ck[1] == self.dtc.attr and (ck[2][self.dtc.mlAny] or self.attributes[ck[0]] in alist):
                             # With an allowed value
                             continue
 
@@ -2104,14 +3395,14 @@ class HTMLnode(DATAnode):
                 # For each set
                 for ck in cd:
                     # For each attribute ck[0]
-                    if self.is_attribute(ck[0]):
+                    if ck[0] in self.attributes:
                         # The attribute is there
-                        alist = self.get_value_list(ck[2], link_values, 'notattrs', 'str')
+                        alist = ck[2][self.dtc.mlConst]
                         if ck[1] == self.dtc.attrNot and self.attributes[ck[0]] in alist:
                             # With an allowed value
                             continue
 
-                        elif ck[1] == self.dtc.attr and not ((len(alist) == 1 and alist[0] == None) or self.attributes[ck[0]] in alist):
+                        elif ck[1] == self.dtc.attr and not (ck[2][self.dtc.mlAny] or self.attributes[ck[0]] in alist):
                             # Without a forbidden value
                             continue
 
@@ -2233,11 +3524,11 @@ class HTMLnode(DATAnode):
         rstr = u''
         if sel_node == self.dtc.selTag:
             rstr = u'    a tag: %s,\n%s' % \
-                (self.print_value_link(sel_def[self.dtc.selPos[self.dtc.selTag]]), spc)
+                (self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selTag]][self.dtc.mlValues]), spc)
 
         elif sel_node == self.dtc.selTags:
             rstr = u'    a tag: %s,\n%s' % \
-                (self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selTags]]), spc)
+                (self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selTags]][self.dtc.mlValues]), spc)
 
         if sel_def[1] &  self.dtc.selAttrs:
             for cd in sel_def[self.dtc.selPos[self.dtc.selAttrs]]:
@@ -2245,11 +3536,11 @@ class HTMLnode(DATAnode):
                     rstr = u'%s    an attribute: "%s",\n%s' % (rstr, ck[0], spc)
                     if ck[1] == self.dtc.attr:
                         rstr = u'%s        %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
                     else:
                         rstr = u'%s        but not %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
         if sel_def[1] &  self.dtc.selNotAttrs:
             for cd in sel_def[self.dtc.selPos[self.dtc.selNotAttrs]]:
@@ -2257,11 +3548,11 @@ class HTMLnode(DATAnode):
                     rstr = u'%s    not an attribute: "%s",\n%s' % (rstr, ck[0], spc)
                     if ck[1] == self.dtc.attr:
                         rstr = u'%s        %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
                     else:
                         rstr = u'%s        unless %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
         if sel_node  in (self.dtc.selNone, self.dtc.selTag, self.dtc.selTags) and sel_def[1] &  self.dtc.selIndex:
             rstr = u'%s    an index: %s,\n%s' % \
@@ -2269,11 +3560,11 @@ class HTMLnode(DATAnode):
 
         if sel_def[1] &  self.dtc.selText:
             rstr = u'%s    a text: %s,\n%s' % \
-                (rstr, self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selText]]), spc)
+                (rstr, self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selText]][self.dtc.mlValues]), spc)
 
         if sel_def[1] &  self.dtc.selTail:
             rstr = u'%s    a tailtext: %s,\n%s' % \
-                (rstr, self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selTail]]), spc)
+                (rstr, self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selTail]][self.dtc.mlValues]), spc)
 
         if rstr == u'':
             return u'.\n%s' % (spc, )
@@ -2348,13 +3639,14 @@ class JSONnode(DATAnode):
         return None
 
     def match_node(self, node_def = None, link_values = None, sel_node=0):
+        # The match lists in node_def have been resolved in DATAnode.resolve_node_def
         if sel_node == self.dtc.selKey:
-            if self.get_value(node_def[self.dtc.selPos[self.dtc.selKey]], link_values, 'key')[0] != self.key:
+            if not self.key in node_def[self.dtc.selPos[self.dtc.selKey]][self.dtc.mlConst]:
                 # The requested key doesn't matches
                 return False
 
         elif sel_node == self.dtc.selKeys:
-            if not self.key in self.get_value_list(node_def[self.dtc.selPos[self.dtc.selKeys]], link_values, 'key'):
+            if not self.key in node_def[self.dtc.selPos[self.dtc.selKeys]][self.dtc.mlConst]:
                 # This key isn't in the list with requested keys
                 return False
 
@@ -2365,12 +3657,12 @@ class JSONnode(DATAnode):
                     # For each key ck[0]
                     if ck[0] in self.keys:
                         # The Key is there
-                        alist = self.get_value_list(ck[2], link_values, 'childkeys')
+                        alist = ck[2][self.dtc.mlConst]
                         if ck[1] == self.dtc.attrNot and self.get_child(ck[0]).value not in alist:
                             # Without a forbidden value
                             continue
 
-                        elif ck[1] == self.dtc.attr and ((len(alist) == 1 and alist[0] == None) or self.get_child(ck[0]).value in alist):
+                        elif ck[1] == self.dtc.attr and (ck[2][self.dtc.mlAny] or self.get_child(ck[0]).value in alist):
                             # With an allowed value
                             continue
 
@@ -2397,12 +3689,12 @@ class JSONnode(DATAnode):
                     # For each key ck[0]
                     if ck[0] in self.keys:
                         # The Key is there
-                        alist = self.get_value_list(ck[2], link_values, 'notchildkeys')
+                        alist = ck[2][self.dtc.mlConst]
                         if ck[1] == self.dtc.attrNot and self.get_child(ck[0]).value in alist:
                             # With an allowed value
                             continue
 
-                        elif ck[1] == self.dtc.attr and not ((len(alist) == 1 and alist[0] == None) or self.get_child(ck[0]).value in alist):
+                        elif ck[1] == self.dtc.attr and not (ck[2][self.dtc.mlAny] or self.get_child(ck[0]).value in alist):
                             # Without a forbidden value
                             continue
 
@@ -2475,11 +3767,11 @@ class JSONnode(DATAnode):
         rstr = u''
         if sel_node == self.dtc.selKey:
             rstr = u'    with a key: %s,\n%s' % \
-                (self.print_value_link(sel_def[self.dtc.selPos[self.dtc.selKey]]), spc)
+                (self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selKey]][self.dtc.mlValues]), spc)
 
         elif sel_node == self.dtc.selKeys:
             rstr = u'    with a key: %s,\n%s' % \
-                (self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selKeys]]), spc)
+                (self.print_value_link_list(sel_def[self.dtc.selPos[self.dtc.selKeys]][self.dtc.mlValues]), spc)
 
         if sel_def[1] &  self.dtc.selChildKeys:
             for cd in sel_def[self.dtc.selPos[self.dtc.selChildKeys]]:
@@ -2492,11 +3784,11 @@ class JSONnode(DATAnode):
 
                     if ck[1] == self.dtc.attr:
                         rstr = u'%s        %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
                     else:
                         rstr = u'%s        but not %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
         if sel_def[1] &  self.dtc.selNotChildKeys:
             for cd in sel_def[self.dtc.selPos[self.dtc.selNotChildKeys]]:
@@ -2509,11 +3801,11 @@ class JSONnode(DATAnode):
 
                     if ck[1] == self.dtc.attr:
                         rstr = u'%s        %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
                     else:
                         rstr = u'%s        unless %s,\n%s' % \
-                            (rstr, self.print_value_link_list(ck[2], add_starter = True), spc)
+                            (rstr, self.print_value_link_list(ck[2][self.dtc.mlValues], add_starter = True), spc)
 
         if sel_node  in (self.dtc.selNone, self.dtc.selKeys) and sel_def[1] &  self.dtc.selIndex:
             rstr = u'%s    with an index: %s,\n%s' % \
@@ -2536,7 +3828,7 @@ class DATAtree():
         self.tree_lock = RLock()
         with self.tree_lock:
             self.tree_type=''
-            self.dtc = DataTreeConstants()
+            self.dtc = dtc
             self.print_searchtree = False
             self.show_result = False
             self.fle = output
@@ -2545,6 +3837,7 @@ class DATAtree():
             self.caller_id = caller_id
             self.extract_from_parent = False
             self.result = []
+            self.link_result = []
             self.quit = False
             self.data_def = {}
             self.month_names = []
@@ -2559,13 +3852,40 @@ class DATAtree():
             self.timezone = pytz.utc
             self.value_filters = {}
             self.str_list_splitter = '\|'
+            # A bounded memo for the pure date/time conversions in calc_type
+            self.memo_types = (self.dtc.typeTimeStamp, self.dtc.typeDateTimeString,
+                    self.dtc.typeTime, self.dtc.typeDateStamp)
+            self.type_memo = {}
+            self.type_memo_size = 4096
+            self.type_memo_hits = 0
+            self.type_memo_misses = 0
+            # Per (error, calc_def/type_def): [count, first value]
+            self.error_counts = {}
+            self.batch_types = (self.dtc.typeTimeStamp, self.dtc.typeInteger, self.dtc.typeFloat,
+                    self.dtc.typeDateStamp, self.dtc.typeTimeDelta)
+            self.transliteration = {}
+            self.lower_ascii_table = translate_table(self.dtc.asciiTable)
+            self.ascii_replace_tables = {}
+            # Used by normalize_text on every extracted string value
+            self.entity_regex = re.compile("&#?\w+;")
+            self.ctrl_table = {ord('\r'): None, ord('\n'): None}
             if sys.modules['DataTreeGrab']._warnings == None:
                 sys.modules['DataTreeGrab']._warnings = _Warnings(warnaction, warngoal, caller_id)
 
             elif caller_id not in sys.modules['DataTreeGrab']._warnings._ids or warnaction != None:
                 sys.modules['DataTreeGrab']._warnings.set_warnaction(warnaction, caller_id)
 
-            self.ddconv = DataDef_Convert(warnaction = warnaction , warngoal = warngoal, caller_id = caller_id)
+            # Only created when this tree has to convert something itself
+            self.ddconv = None
+            # Set to use a frozen converted data_def from data_def_registry
+            self.shared_def = False
+
+    def get_ddconv(self):
+        with self.tree_lock:
+            if self.ddconv == None:
+                self.ddconv = DataDef_Convert(warnaction = None, caller_id = self.caller_id)
+
+            return self.ddconv
 
     def _get_type(self, node_def):
         if (node_def[0] & self.dtc.isGroup) == self.dtc.isValue and (node_def[0] & self.dtc.hasType):
@@ -2584,17 +3904,30 @@ class DATAtree():
     def check_data_def(self, data_def):
         with self.tree_lock:
             if is_data_value("dtversion", data_def, tuple):
-                self.data_def = data_def
-                if data_def["dtversion"] != self.ddconv.dtversion():
+                if data_def["dtversion"] != tuple(version()[1:4]):
+                    # The converted layout can differ between versions
                     self.warn('Your supplied data_def was converted using version %d.%d.%d.\n' % data_def["dtversion"] + \
-                        'You best reconvert it with the current version.', dtdata_defWarning, 2)
+                        'Reconvert it with the current version.', dtdata_defWarning, 1)
+                    return dte.dtDataDefInvalid
+
+                self.data_def = data_def
+
+            elif self.shared_def:
+                errorcode, cdata_def = data_def_registry.get(self.get_ddconv(), data_def)
+                if errorcode & dte.dtFatalError != dte.dtDataDefOK:
+                    return errorcode & dte.dtFatalError
+
+                # On a registry hit the converter has not seen this data_def
+                self.ddconv.cdata_def = cdata_def
+                self.data_def = cdata_def
 
             else:
-                self.ddconv.convert_data_def(data_def)
-                if self.ddconv.errorcode & dte.dtFatalError != dte.dtDataDefOK:
-                    return self.ddconv.errorcode & dte.dtFatalError
+                ddconv = self.get_ddconv()
+                ddconv.convert_data_def(data_def)
+                if ddconv.errorcode & dte.dtFatalError != dte.dtDataDefOK:
+                    return ddconv.errorcode & dte.dtFatalError
 
-                self.data_def = self.ddconv.cdata_def
+                self.data_def = ddconv.cdata_def
 
             if not self.data_def["dttype"] in (self.tree_type, ''):
                 self.warn('Your data_def is written for a %s tree and is not usable for %s data' \
@@ -2611,6 +3944,9 @@ class DATAtree():
             self.set_timezone(self.data_def["tz"])
             self.value_filters = self.data_def["value-filters"]
             self.str_list_splitter = self.data_def["str-list-splitter"]
+            self.transliteration = data_value("transliteration", self.data_def, dict)
+            self.lower_ascii_table = translate_table(self.dtc.asciiTable, self.transliteration)
+            self.ascii_replace_tables = {}
 
     def set_timezone(self, timezone = None):
         with self.tree_lock:
@@ -2635,9 +3971,32 @@ class DATAtree():
                         self.warn('Invalid timezone "%s" suplied. Falling back to UTC' % (timezone, ), dtdata_defWarning, 2)
                         self.timezone = pytz.utc
 
+            # datetimestring results depend on the timezone
+            self.clear_type_memo()
             self.set_current_date()
             self.set_current_weekdays()
 
+    def set_type_memo_size(self, size):
+        # Set the bound on the calc_type memo. 0 disables it
+        with self.tree_lock:
+            self.type_memo_size = size if (isinstance(size, int) and size >= 0) else 0
+            self.type_memo = {}
+
+    def clear_type_memo(self):
+        with self.tree_lock:
+            self.type_memo = {}
+            self.type_memo_hits = 0
+            self.type_memo_misses = 0
+
+    def type_memo_stats(self):
+        with self.tree_lock:
+            lookups = self.type_memo_hits + self.type_memo_misses
+            return {"hits": self.type_memo_hits,
+                    "misses": self.type_memo_misses,
+                    "hit-rate": float(self.type_memo_hits) / lookups if lookups > 0 else 0.0,
+                    "size": len(self.type_memo),
+                    "maxsize": self.type_memo_size}
+
     def set_current_date(self, cdate = None):
         with self.tree_lock:
             if isinstance(cdate, datetime.datetime):
@@ -2698,7 +4057,8 @@ class DATAtree():
 
             links = {"values": {},"nodes": {}}
             init_path = self.data_def["data"]["init-path"]
-            sn = self.root.get_children(path_def = init_path, links = links)
+            sn = self.root.get_children(path_def = init_path, links = links, trace = self.show_result)
+
             if sn == None or len(sn) == 0 or not isinstance(sn[0][0], DATAnode):
                 self.warn('"init-path": %s did not result in a valid node. Falling back to the rootnode' \
                     % (init_path, ), dtParseWarning, 2)
@@ -2709,10 +4069,20 @@ class DATAtree():
                 self.start_node = sn[0][0]
                 return dte.dtDataOK
 
+    def convert_path_def(self, path_def):
+        # Return the converted path_def and the conversion errorcode
+        # using the defaults of the data_def of this tree
+        with self.tree_lock:
+            ddconv = self.get_ddconv()
+            ddconv.cdata_def = self.data_def
+            cpath = ddconv.convert_path_def(path_def)
+            return (cpath, ddconv.errorcode)
+
     def find_data_value(self, path_def, start_node = None, links = None, searchname = ''):
         with self.tree_lock:
             if isinstance(path_def, list):
-                path_def = self.ddconv.convert_path_def(path_def)
+                context = [data_value(k, self.data_def) for k in self.get_ddconv().path_def_defaults]
+                path_def = path_def_cache.get(path_def, self.convert_path_def, context)
 
             if not isinstance(path_def, tuple):
                 self.warn('Invalid "path_def": %s supplied to "find_data_value"' % (path_def, ), dtParseWarning, 1)
@@ -2732,7 +4102,8 @@ class DATAtree():
             if searchname != '' and self.show_result:
                 self.print_text('Parsing %s starting at %s' % (searchname, start_node.print_node()))
 
-            nlist = start_node.get_children(path_def = path_def, links = links)
+            nlist = start_node.get_children(path_def = path_def, links = links, trace = self.show_result)
+
             if (path_def[-1][0] & self.dtc.isGroup == self.dtc.isValue) and \
                 (path_def[-1][1][0] & self.dtc.getGroup == self.dtc.getPresence):
                 # We return True if exactly one node is found, else False
@@ -2784,7 +4155,11 @@ class DATAtree():
             else:
                 return self._get_default(path_def[-1])
 
-    def extract_datalist(self, data_def=None):
+    def extract_datalist(self, data_def=None, workers = 1, link_function = None, batch_typing = False, skip_unused = False):
+        # With workers > 1 the key nodes are divided over that many forked processes
+        # If given link_function is called on every value list and its results are stored in self.link_result
+        # With batch_typing the numeric types of the values are set per column after extraction
+        # With skip_unused the values no "values" link_def uses are not searched and left None
         with self.tree_lock:
             if isinstance(data_def, dict):
                 x = self.check_data_def(data_def)
@@ -2803,21 +4178,30 @@ class DATAtree():
                 self.start_node.print_tree()
 
             self.result = []
+            self.link_result = []
+            self.error_counts = {}
             def_list = []
             for dset in self.data_def['data']['iter']:
                 if len(dset["key-path"]) == 0:
                     continue
 
-                if self.show_result:
-                    self.print_text(u'Parsing the key_path starting at %s' % (self.start_node.print_node(), ))
-
-                links = {"values": {},"nodes": {}}
-                self.key_list = self.start_node.get_children(path_def = dset["key-path"], links = links)
+                self.key_list = self.find_key_list(dset["key-path"])
                 k_cnt = len(self.key_list)
                 k_item = 0
                 if self.show_progress:
                     self.progress_queue.put((k_item, k_cnt))
 
+                values = self.used_values(dset["values"]) if skip_unused else dset["values"]
+                if batch_typing:
+                    values = self.defer_types(values)
+
+                if workers > 1 and k_cnt > 1 and hasattr(os, 'fork'):
+                    if self.extract_parallel(values, workers, link_function, batch_typing) == dte.dtQuiting:
+                        return dte.dtQuiting
+
+                    continue
+
+                rows = []
                 for k in self.key_list:
                     if self.quit:
                         return dte.dtQuiting
@@ -2826,146 +4210,535 @@ class DATAtree():
                     if self.show_progress:
                         self.progress_queue.put((k_item, k_cnt))
 
-                    if not (isinstance(k, tuple) and len(k) == 2):
-                        continue
+                    tlist = self.extract_key(k, values)
+                    if tlist != None:
+                        self.result.append(tlist)
+                        rows.append(tlist)
+                        if link_function != None and not batch_typing:
+                            self.link_result.append(link_function(tlist))
 
-                    # And if it's a valid node, find the belonging end_links
-                    # and value (the last dict in a path list contains the value definition)
-                    links = k[0].end_links
-                    tlist = [k[1]]
-                    if self.show_result:
-                        self.print_text(u'parsing key %s' % (tlist, ))
-
-                    i = 0
-                    for v in dset["values"][:]:
-                        i += 1
-                        if self.show_result:
-                            self.print_text(u'  searching for value %s' % (i, ))
-                        if not isinstance(v, tuple) or len(v) == 0:
-                            tlist.append(None)
-                            continue
+                if batch_typing:
+                    self.batch_type(rows)
+                    if link_function != None:
+                        for tlist in rows:
+                            self.link_result.append(link_function(tlist))
 
-                        if self.extract_from_parent and isinstance(k[0].parent, DATAnode):
-                            dv = self.find_data_value(v, k[0].parent, links)
+            if len(self.result) == 0:
+                if self.show_progress:
+                    self.progress_queue.put((0, 0))
 
-                        else:
-                            dv = self.find_data_value(v, k[0], links)
+                return dte.dtNoData
 
-                        if isinstance(dv, NULLnode):
-                            break
+            return dte.dtDataOK
 
-                        tlist.append(dv)
+    def find_key_list(self, key_path):
+        # Return the key nodes key_path gives from the start node
+        with self.tree_lock:
+            if self.show_result:
+                self.print_text(u'Parsing the key_path starting at %s' % (self.start_node.print_node(), ))
 
-                    else:
-                        self.result.append(tlist)
+            links = {"values": {},"nodes": {}}
+            return self.start_node.get_children(path_def = key_path, links = links, trace = self.show_result)
 
-            if len(self.result) == 0:
+    def iter_datalist(self, skip_unused = False):
+        # A generator yielding the value list of every key node as soon as it is extracted,
+        # without storing them in self.result. It stops on self.quit and only holds
+        # the tree_lock while extracting, not while the consumer has the value list.
+        with self.tree_lock:
+            self.error_counts = {}
+            if not isinstance(self.start_node, DATAnode):
+                self.warn('Unable to search the tree. Invalid dataset!', dtDataWarning, 1)
                 if self.show_progress:
                     self.progress_queue.put((0, 0))
 
-                return dte.dtNoData
-
-            return dte.dtDataOK
+                return
 
-    def calc_value(self, value, calc_def):
-        def calc_warning(text, severity=4):
-            self.warn('%s calculation Error on value: "%s"\n   Using node_def: %s' % \
-                (text, value, calc_def), dtCalcWarning, severity, 3)
+            if self.print_searchtree:
+                self.print_text('The %s Tree:' % (self.start_node.print_node(), ))
+                self.start_node.print_tree()
 
-        if not isinstance(calc_def, tuple):
-            return value
+            dsets = self.data_def['data']['iter']
 
-        for cd in calc_def:
-            try:
-                if isinstance(value, (str, unicode)):
-                    if cd[0] == self.dtc.calcLettering:
-                        if cd[1] == self.dtc.calcLower:
-                            value = unicode(value).lower().strip()
+        found = False
+        for dset in dsets:
+            if len(dset["key-path"]) == 0:
+                continue
 
-                        elif cd[1] == self.dtc.calcUpper:
-                            value = unicode(value).upper().strip()
+            key_list = self.find_key_list(dset["key-path"])
+            values = self.used_values(dset["values"]) if skip_unused else dset["values"]
+            k_cnt = len(key_list)
+            k_item = 0
+            if self.show_progress:
+                self.progress_queue.put((k_item, k_cnt))
 
-                        elif cd[1] == self.dtc.calcCapitalize:
-                            value = unicode(value).capitalize().strip()
+            for k in key_list:
+                if self.quit:
+                    return
 
-                    elif cd[0] == self.dtc.calcAsciiReplace:
-                        value = value.lower()
-                        if len(cd[1]) > 2:
-                            value = re.sub(cd[1][2], cd[1][1], value)
+                k_item += 1
+                if self.show_progress:
+                    self.progress_queue.put((k_item, k_cnt))
 
-                        value = value.encode('ascii','replace')
-                        value = re.sub('\?', cd[1][0], value)
+                with self.tree_lock:
+                    tlist = self.extract_key(k, values)
 
-                    elif cd[0] == self.dtc.calcLstrip:
-                        if value.strip().lower()[:len(cd[1])] == cd[1].lower():
-                            value = unicode(value[len(cd[1]):]).strip()
+                if tlist != None:
+                    found = True
+                    yield tlist
 
-                    elif cd[0] == self.dtc.calcRstrip:
-                        if value.strip().lower()[-len(cd[1]):] == cd[1].lower():
-                            value = unicode(value[:-len(cd[1])]).strip()
+        if not found and self.show_progress:
+            self.progress_queue.put((0, 0))
 
-                    elif cd[0] == self.dtc.calcSub:
-                        for sset in cd[1]:
-                            value = re.sub(sset[0], sset[1], value).strip()
+    def extract_key(self, k, values):
+        # Return the value list for one key node
+        # or None if it is invalid or a value is not in its value_filter list
+        if not (isinstance(k, tuple) and len(k) == 2):
+            return None
 
-                    elif cd[0] == self.dtc.calcSplit:
-                        for sset in cd[1]:
-                            try:
-                                fill_char = sset[0]
-                                if fill_char in ('\\s', '\\t', '\\n', '\\r', '\\f', '\\v', ' ','\\s*', '\\t*', '\\n*', '\\r*', '\\f*', '\\v*'):
-                                    fill_char = ' '
-                                    value = value.strip()
+        # And if it's a valid node, find the belonging end_links
+        # and value (the last dict in a path list contains the value definition)
+        links = k[0].end_links
+        tlist = [k[1]]
+        trace = self.show_result
+        if trace:
+            self.print_text(u'parsing key %s' % (tlist, ))
+
+        i = 0
+        for v in values:
+            i += 1
+            if trace:
+                self.print_text(u'  searching for value %s' % (i, ))
+            if not isinstance(v, tuple) or len(v) == 0:
+                tlist.append(None)
+                continue
 
-                                dat = re.split(sset[0],value)
-                                if sset[1] == 'list-all':
-                                    value = dat
+            if self.extract_from_parent and isinstance(k[0].parent, DATAnode):
+                dv = self.find_data_value(v, k[0].parent, links)
 
-                                else:
-                                    value = dat[sset[1]]
-                                    for i in range(2, len(sset)):
-                                        if ( 0<= sset[i] < len(dat)) or (-len(dat) <= sset[i] < 0):
-                                            value = value + fill_char +  dat[sset[i]]
+            else:
+                dv = self.find_data_value(v, k[0], links)
 
-                            except:
-                                calc_warning('split')
+            if isinstance(dv, NULLnode):
+                return None
 
-                if cd[0] == self.dtc.calcMultiply:
-                    try:
-                        value = int(value) * cd[1]
+            tlist.append(dv)
 
-                    except:
-                        calc_warning('multiplier')
+        return tlist
 
-                elif cd[0] == self.dtc.calcDivide:
-                    try:
-                        value = int(value) // cd[1]
+    def extract_parallel(self, values, workers, link_function = None, batch_typing = False):
+        # Divide self.key_list in contiguous slices, each extracted in a forked process
+        # that inherits the tree, and merge the results back in document order
+        def extract_slice(sno, klist):
+            _reset_fork_locks()
+            self.tree_lock = RLock()
+            if self.ddconv != None:
+                self.ddconv.tree_lock = RLock()
 
-                    except:
-                        calc_warning('divider')
+            try:
+                if isinstance(sys.modules['DataTreeGrab']._warnings.warngoal, Queue):
+                    sys.modules['DataTreeGrab']._warnings.warngoal = _WarningForwarder(mpqueue)
 
-                elif cd[0] == self.dtc.calcReplace:
-                    if isinstance(value, (str, unicode)):
-                        v = value.strip().lower()
+                rows = []
+                k_item = 0
+                for k in klist:
+                    k_item += 1
+                    if k_item % 25 == 0:
+                        mpqueue.put(('progress', sno, 25))
 
-                    else:
-                        v = value
+                    tlist = self.extract_key(k, values)
+                    if tlist != None:
+                        rows.append(tlist)
 
-                    if v in cd[1]:
-                        value = cd[2][cd[1].index(v)]
+                if batch_typing:
+                    self.batch_type(rows)
 
-                    else:
-                        value = None
+                rlist = [(tlist, None if link_function == None else link_function(tlist)) for tlist in rows]
+                mpqueue.put(('progress', sno, k_item % 25))
+                mpqueue.put(('errors', sno, self.error_counts))
+                mpqueue.put(('result', sno, rlist))
 
             except:
-                #~ traceback.print_exc()
-                calc_warning('unknown')
+                mpqueue.put(('error', sno, traceback.format_exc()))
+
+        def stop_workers():
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+
+                p.join()
+
+        k_cnt = len(self.key_list)
+        size = -(-k_cnt // workers)
+        slices = [self.key_list[i:i + size] for i in range(0, k_cnt, size)]
+        mpqueue = multiprocessing.Queue()
+        procs = []
+        # Make sure no other thread holds a lock the workers need while forking
+        with _ForkLocks(self.tree_lock, None if self.ddconv == None else self.ddconv.tree_lock):
+            for sno in range(len(slices)):
+                p = multiprocessing.Process(target = extract_slice, args = (sno, slices[sno]))
+                p.daemon = True
+                p.start()
+                procs.append(p)
+
+        results = {}
+        error_counts = {}
+        k_item = 0
+        while len(results) < len(slices):
+            if self.quit:
+                stop_workers()
+                return dte.dtQuiting
 
-        return value
+            try:
+                msg = mpqueue.get(True, 0.1)
+
+            except Empty:
+                for sno in range(len(procs)):
+                    if not sno in results and not procs[sno].is_alive() and procs[sno].exitcode != 0:
+                        self.warn('Extraction worker %s exited with code %s' % (sno, procs[sno].exitcode), dtDataWarning, 1)
+                        results[sno] = None
+
+                continue
+
+            if msg[0] == 'progress':
+                k_item += msg[2]
+                if self.show_progress:
+                    self.progress_queue.put((k_item, k_cnt))
+
+            elif msg[0] == 'warning':
+                sys.modules['DataTreeGrab']._warnings.warngoal.put(msg[2])
+
+            elif msg[0] == 'errors':
+                error_counts[msg[1]] = msg[2]
+
+            elif msg[0] == 'result':
+                results[msg[1]] = msg[2]
+
+            elif msg[0] == 'error':
+                self.warn('Extraction worker %s failed:\n%s' % (msg[1], msg[2]), dtDataWarning, 1)
+                results[msg[1]] = None
+
+        stop_workers()
+        for sno in range(len(slices)):
+            if results[sno] != None and sno in error_counts.keys():
+                self.merge_error_counts(error_counts[sno])
+
+            if results[sno] == None:
+                # Extract a failed slice in this process
+                rows = []
+                for k in slices[sno]:
+                    if self.quit:
+                        return dte.dtQuiting
+
+                    tlist = self.extract_key(k, values)
+                    if tlist != None:
+                        rows.append(tlist)
+
+                if batch_typing:
+                    self.batch_type(rows)
+
+                for tlist in rows:
+                    self.result.append(tlist)
+                    if link_function != None:
+                        self.link_result.append(link_function(tlist))
+
+                continue
+
+            for tlist, lvalues in results[sno]:
+                self.result.append(tlist)
+                if link_function != None:
+                    self.link_result.append(lvalues)
+
+        return dte.dtDataOK
+
+    def columnar_result(self):
+        # Return self.result as a ColumnarResult with column 0 holding the keys
+        # and columns 1 and up the values
+        width = max([len(tlist) for tlist in self.result]) if len(self.result) > 0 else 0
+        cresult = ColumnarResult(range(width))
+        for tlist in self.result:
+            cresult.append_list(tlist)
+
+        return cresult
+
+    def used_values(self, values):
+        # Return the value path_defs with those no "values" link_def uses replaced by an empty one,
+        # so extract_key skips them and puts None in their slot. A path that stores a link
+        # or node, or filters on "member-off" can influence the other values and is kept
+        used = data_value("used-varids", self.data_def, frozenset, None)
+        if used == None:
+            return values
+
+        uvalues = []
+        for i in range(len(values)):
+            v = values[i]
+            if isinstance(v, tuple) and not (i + 1) in used:
+                for node_def in v:
+                    if (node_def[0] & self.dtc.isGroup) == self.dtc.isNodeLink \
+                      or (node_def[0] & (self.dtc.storeLinkValue + self.dtc.isMemberOff)):
+                        break
+
+                else:
+                    v = ()
+
+            uvalues.append(v)
+
+        return tuple(uvalues)
+
+    def defer_types(self, values):
+        # Return the value path_defs with the typing of the numeric batch_types
+        # on their final value node marked to be deferred to batch_type
+        dvalues = []
+        for v in values:
+            if isinstance(v, tuple) and len(v) > 0 and (v[-1][0] & self.dtc.isGroup) == self.dtc.isValue \
+              and (v[-1][0] & self.dtc.hasType) and not (v[-1][0] & (self.dtc.storeLinkValue + self.dtc.isMemberOff)) \
+              and self._get_type(v[-1]) in self.batch_types:
+                v = v[:-1] + (((v[-1][0] | self.dtc.deferType), ) + v[-1][1:], )
+
+            dvalues.append(v)
+
+        return tuple(dvalues)
+
+    def batch_type(self, rows):
+        # Set in place the type of all DeferredValues in the extracted rows,
+        # converting per type_def all values at once
+        def collect(vlist):
+            for index in range(len(vlist)):
+                v = vlist[index]
+                if isinstance(v, DeferredValue):
+                    if not v.type_def in columns.keys():
+                        columns[v.type_def] = []
+
+                    columns[v.type_def].append((vlist, index, v.value))
+
+                elif isinstance(v, list):
+                    collect(v)
+
+                elif isinstance(v, dict):
+                    for k in v.keys():
+                        if isinstance(v[k], list):
+                            collect(v[k])
+
+        columns = {}
+        collect(rows)
+        for type_def, column in columns.items():
+            tlist = self.calc_type_list([item[2] for item in column], type_def)
+            for index in range(len(column)):
+                column[index][0][column[index][1]] = tlist[index]
+
+    def calc_type_list(self, values, type_def):
+        # The bulk version of calc_type for the batch_types, using numpy if available
+        # Any value it can not convert goes through calc_type for the regular warning
+        def long_literal(v):
+            return isinstance(v, (str, unicode)) and v.strip()[-1:] in ('l', 'L')
+
+        def to_numbers(ntype):
+            # numpy converts to int through long(), which unlike int() accepts a trailing "L"
+            if numpy != None and not (ntype == int and any([long_literal(v) for v in values])):
+                try:
+                    return numpy.array(values, dtype = object).astype(numpy.int64 if ntype == int else numpy.float64).tolist()
+
+                except (ValueError, TypeError, OverflowError):
+                    pass
+
+            nlist = []
+            for v in values:
+                try:
+                    nlist.append(ntype(v))
+
+                except:
+                    nlist.append(None)
+
+            return nlist
+
+        def single(value):
+            value = self.calc_type(value, type_def)
+            if isinstance(value, (str, unicode)):
+                value = self.normalize_text(value)
+
+            return value
+
+        if type_def[0] == self.dtc.typeFloat:
+            nlist = to_numbers(float)
+
+        else:
+            nlist = to_numbers(int)
+
+        tlist = []
+        for index in range(len(values)):
+            n = nlist[index]
+            if n == None:
+                tlist.append(single(values[index]))
+                continue
+
+            try:
+                if type_def[0] in (self.dtc.typeInteger, self.dtc.typeFloat):
+                    tlist.append(n)
+
+                elif type_def[0] == self.dtc.typeTimeStamp:
+                    tlist.append(datetime.datetime.fromtimestamp(float(n/type_def[1]), self.utc))
+
+                elif type_def[0] == self.dtc.typeDateStamp:
+                    tlist.append(datetime.date.fromtimestamp(float(n/type_def[1])))
+
+                elif type_def[0] == self.dtc.typeTimeDelta:
+                    tlist.append(datetime.timedelta(seconds = n))
+
+                else:
+                    tlist.append(single(values[index]))
+
+            except:
+                tlist.append(single(values[index]))
+
+        return tlist
+
+    def count_error(self, text, def_item, value):
+        # Count a conversion error per kind and data_def item, keeping the first value as example
+        # The def_item holds no position, so identical items on different places share a count
+        key = (text, def_item)
+        try:
+            hash(key)
+
+        except TypeError:
+            # The date-sequence and time-type in a type_def are lists
+            key = (text, hashable_def(def_item))
+
+        if key in self.error_counts:
+            self.error_counts[key][0] += 1
+
+        else:
+            self.error_counts[key] = [1, value]
+
+    def merge_error_counts(self, error_counts):
+        for key, count in error_counts.items():
+            if key in self.error_counts:
+                self.error_counts[key][0] += count[0]
+
+            else:
+                self.error_counts[key] = list(count)
+
+    def calc_value(self, value, calc_def):
+        def calc_warning(text, severity=4):
+            self.count_error(text, calc_def, value)
+            if sys.modules['DataTreeGrab']._warnings.wants(dtCalcWarning, self.caller_id, severity):
+                self.warn('%s calculation Error on value: "%s"\n   Using node_def: %s' % \
+                    (text, value, calc_def), dtCalcWarning, severity, 3)
+
+        if not isinstance(calc_def, tuple):
+            return value
+
+        for cd in calc_def:
+            try:
+                if isinstance(value, (str, unicode)):
+                    if cd[0] == self.dtc.calcLettering:
+                        if cd[1] == self.dtc.calcLower:
+                            value = unicode(value).lower().strip()
+
+                        elif cd[1] == self.dtc.calcUpper:
+                            value = unicode(value).upper().strip()
+
+                        elif cd[1] == self.dtc.calcCapitalize:
+                            value = unicode(value).capitalize().strip()
+
+                    elif cd[0] == self.dtc.calcAsciiReplace:
+                        value = unicode(value).lower()
+                        if len(cd[1]) > 2:
+                            value = regex_cache.compile(cd[1][2]).sub(cd[1][1], value)
+
+                        if not cd[1][0] in self.ascii_replace_tables.keys():
+                            self.ascii_replace_tables[cd[1][0]] = AsciiReplaceTable(self.transliteration, cd[1][0])
+
+                        value = value.translate(self.ascii_replace_tables[cd[1][0]])
+
+                    elif cd[0] == self.dtc.calcLstrip:
+                        if value.strip().lower()[:len(cd[1])] == cd[1].lower():
+                            value = unicode(value[len(cd[1]):]).strip()
+
+                    elif cd[0] == self.dtc.calcRstrip:
+                        if value.strip().lower()[-len(cd[1]):] == cd[1].lower():
+                            value = unicode(value[:-len(cd[1])]).strip()
+
+                    elif cd[0] == self.dtc.calcSub:
+                        for sset in cd[1]:
+                            value = regex_cache.compile(sset[0]).sub(sset[1], value).strip()
+
+                    elif cd[0] == self.dtc.calcSplit:
+                        for sset in cd[1]:
+                            try:
+                                fill_char = sset[0]
+                                if fill_char in ('\\s', '\\t', '\\n', '\\r', '\\f', '\\v', ' ','\\s*', '\\t*', '\\n*', '\\r*', '\\f*', '\\v*'):
+                                    fill_char = ' '
+                                    value = value.strip()
+
+                                dat = regex_cache.compile(sset[0]).split(value)
+                                if sset[1] == 'list-all':
+                                    value = dat
+
+                                else:
+                                    value = dat[sset[1]]
+                                    for i in range(2, len(sset)):
+                                        if ( 0<= sset[i] < len(dat)) or (-len(dat) <= sset[i] < 0):
+                                            value = value + fill_char +  dat[sset[i]]
+
+                            except:
+                                calc_warning('split')
+
+                if cd[0] == self.dtc.calcMultiply:
+                    try:
+                        value = int(value) * cd[1]
+
+                    except:
+                        calc_warning('multiplier')
+
+                elif cd[0] == self.dtc.calcDivide:
+                    try:
+                        value = int(value) // cd[1]
+
+                    except:
+                        calc_warning('divider')
+
+                elif cd[0] == self.dtc.calcReplace:
+                    if isinstance(value, (str, unicode)):
+                        v = value.strip().lower()
+
+                    else:
+                        v = value
+
+                    if v in cd[1]:
+                        value = cd[2][cd[1].index(v)]
+
+                    else:
+                        value = None
+
+            except:
+                #~ traceback.print_exc()
+                calc_warning('unknown')
+
+        return value
 
     def calc_type(self, value, type_def):
         def calc_warning(text, severity=4):
-            self.warn('%s typesetting Error on value: "%s"\n   Using node_def: %s' % \
-                (text, value, type_def), dtCalcWarning, severity, 3)
+            warned.append(text)
+            self.count_error(text, type_def, value)
+            if sys.modules['DataTreeGrab']._warnings.wants(dtCalcWarning, self.caller_id, severity):
+                self.warn('%s typesetting Error on value: "%s"\n   Using node_def: %s' % \
+                    (text, value, type_def), dtCalcWarning, severity, 3)
+
+        warned = []
+        memo_key = None
+        if type_def[0] in self.memo_types and self.type_memo_size > 0:
+            # These only depend on the value, the type_def and the timezone
+            try:
+                memo_key = (type_def, value)
+                rvalue = self.type_memo[memo_key]
+                self.type_memo_hits += 1
+                return rvalue
+
+            except KeyError:
+                self.type_memo_misses += 1
+
+            except TypeError:
+                # Not hashable
+                memo_key = None
 
         try:
             if type_def[0] == self.dtc.typeTimeStamp:
@@ -2995,7 +4768,7 @@ class DATAtree():
                         ttype = '24'
                         tvalue = value.strip()
 
-                    t = re.split(type_def[2], tvalue)
+                    t = regex_cache.compile(type_def[2]).split(tvalue)
                     hour = int(data_value(0, t, str, '00'))
                     minute = int(data_value(1, t, str, '00'))
                     second = int(data_value(2, t, str, '00'))
@@ -3019,7 +4792,7 @@ class DATAtree():
                     day = self.current_date.day
                     month = self.current_date.month
                     year = self.current_date.year
-                    d = re.split(type_def[2], value)
+                    d = regex_cache.compile(type_def[2]).split(value)
                     for index in range(len(d)):
                         if index > len(type_def[1])-1:
                             break
@@ -3095,39 +4868,11 @@ class DATAtree():
                         value = False
 
             elif type_def[0] == self.dtc.typeLowerAscii and isinstance(value, (str, unicode)):
-                value = value.lower()
-                value =re.sub('[ /]', '_', value)
-                value =re.sub('[!(),]', '', value)
-                value = re.sub('á','a', value)
-                value = re.sub('à','a', value)
-                value = re.sub('ä','a', value)
-                value = re.sub('â','a', value)
-                value = re.sub('ã','a', value)
-                value = re.sub('@','a', value)
-                value = re.sub('é','e', value)
-                value = re.sub('è','e', value)
-                value = re.sub('ë','e', value)
-                value = re.sub('ê','e', value)
-                value = re.sub('í','i', value)
-                value = re.sub('ì','i', value)
-                value = re.sub('ï','i', value)
-                value = re.sub('î','i', value)
-                value = re.sub('ó','o', value)
-                value = re.sub('ò','o', value)
-                value = re.sub('ö','o', value)
-                value = re.sub('ô','o', value)
-                value = re.sub('õ','o', value)
-                value = re.sub('ú','u', value)
-                value = re.sub('ù','u', value)
-                value = re.sub('ü','u', value)
-                value = re.sub('û','u', value)
-                value = re.sub('ý','y', value)
-                value = re.sub('ÿ','y', value)
-                value = value.encode('ascii','replace')
+                value = unicode(value).lower().translate(self.lower_ascii_table).encode('ascii','replace')
 
             elif type_def[0] == self.dtc.typeStringList:
                 try:
-                    value = list(re.split(type_def[1], value))
+                    value = list(regex_cache.compile(type_def[1]).split(value))
                     if type_def[2]:
                         while '' in value:
                             value.remove('')
@@ -3145,6 +4890,13 @@ class DATAtree():
             #~ traceback.print_exc()
             calc_warning('unknown')
 
+        if memo_key != None and len(warned) == 0:
+            # Only remember successful conversions, so failures keep warning
+            if len(self.type_memo) >= self.type_memo_size:
+                self.type_memo = {}
+
+            self.type_memo[memo_key] = value
+
         return value
 
     def un_escape(self, text):
@@ -3181,7 +4933,25 @@ class DATAtree():
         if not isinstance(text,(str, unicode)):
             return text
 
-        return unicode(re.sub("&#?\w+;", fixup, text))
+        if not '&' in text:
+            # Nothing to decode
+            return unicode(text)
+
+        return unicode(self.entity_regex.sub(fixup, text))
+
+    def normalize_text(self, text):
+        # Make sure a string is unicode, free of HTML entities, carriage returns
+        # and linefeeds and stripped. Any decoded '\r' or '\n' is also removed.
+        # It runs per value, as a stored link value is used in the next path steps at once
+        text = unicode(text)
+        if '&' in text:
+            text = self.un_escape(text)
+
+        if '\n' in text or '\r' in text:
+            text = text.translate(self.ctrl_table)
+
+        return text.strip()
+
     def print_text(self, text):
         if self.fle in (sys.stdout, sys.stderr):
             self.fle.write(text.encode('utf-8', 'replace'))
@@ -3211,7 +4981,12 @@ class HTMLtree(HTMLParser, DATAtree):
         with self.tree_lock:
             self.tree_type ='html'
             self.print_tags = print_tags
-            self.autoclose_tags = autoclose_tags
+            if self.print_tags:
+                # Switch the parser over to the instrumented tag handlers
+                self.handle_starttag = self.handle_starttag_traced
+                self.handle_endtag = self.handle_endtag_traced
+
+            self.autoclose_tags = list(autoclose_tags)
             self.is_tail = False
             self.root = HTMLnode(self, 'root')
             self.current_node = self.root
@@ -3228,6 +5003,7 @@ class HTMLtree(HTMLParser, DATAtree):
 
                 self.feed(data)
                 self.reset()
+                self.fold_case()
                 self.start_node = self.root
 
             except:
@@ -3294,15 +5070,6 @@ class HTMLtree(HTMLParser, DATAtree):
             self.open_tags[tag] = 0
 
         self.open_tags[tag] += 1
-        if self.print_tags:
-            if len(attrs) > 0:
-                self.print_text(u'%sstarting %s %s %s' % (self.current_node.get_leveltabs(2), self.current_node.level+1, tag, attrs[0]))
-                for a in range(1, len(attrs)):
-                    self.print_text(u'%s        %s' % (self.current_node.get_leveltabs(2), attrs[a]))
-
-            else:
-                self.print_text(u'%sstarting %s %s' % (self.current_node.get_leveltabs(2), self.current_node.level,tag))
-
         node = HTMLnode(self, [tag.lower(), attrs], self.current_node)
         self.add_text()
         self.current_node = node
@@ -3313,6 +5080,17 @@ class HTMLtree(HTMLParser, DATAtree):
 
         return True
 
+    def handle_starttag_traced(self, tag, attrs):
+        if len(attrs) > 0:
+            self.print_text(u'%sstarting %s %s %s' % (self.current_node.get_leveltabs(2), self.current_node.level+1, tag, attrs[0]))
+            for a in range(1, len(attrs)):
+                self.print_text(u'%s        %s' % (self.current_node.get_leveltabs(2), attrs[a]))
+
+        else:
+            self.print_text(u'%sstarting %s %s' % (self.current_node.get_leveltabs(2), self.current_node.level,tag))
+
+        return HTMLtree.handle_starttag(self, tag, attrs)
+
     def handle_endtag(self, tag):
         if not tag in self.open_tags.keys() or self.open_tags[tag] == 0:
             return
@@ -3323,11 +5101,24 @@ class HTMLtree(HTMLParser, DATAtree):
             self.handle_endtag(self.current_node.tag)
 
         self.add_text()
-        if self.print_tags:
-            if self.current_node.text.strip() != '':
-                self.print_text(u'%s        %s' % (self.current_node.get_leveltabs(2, -1), self.current_node.text.strip()))
-            self.print_text(u'%sclosing %s %s %s' % (self.current_node.get_leveltabs(2, -1), self.current_node.level,tag, self.current_node.tag))
+        self.close_node()
+
+    def handle_endtag_traced(self, tag):
+        if not tag in self.open_tags.keys() or self.open_tags[tag] == 0:
+            return
+
+        self.open_tags[tag] -= 1
+        if self.current_node.tag != tag.lower():
+            # To catch missing close tags
+            self.handle_endtag(self.current_node.tag)
+
+        self.add_text()
+        if self.current_node.text.strip() != '':
+            self.print_text(u'%s        %s' % (self.current_node.get_leveltabs(2, -1), self.current_node.text.strip()))
+        self.print_text(u'%sclosing %s %s %s' % (self.current_node.get_leveltabs(2, -1), self.current_node.level,tag, self.current_node.tag))
+        self.close_node()
 
+    def close_node(self):
         self.last_node = self.current_node
         self.is_tail = True
         self.current_node = self.current_node.parent
@@ -3375,14 +5166,27 @@ class HTMLtree(HTMLParser, DATAtree):
         pass
 
     def add_text(self):
+        if self.text == u'':
+            return
+
+        text = unicode(self.text).translate(self.ctrl_table).strip()
         if self.is_tail:
-            self.last_node.tail += unicode(re.sub('\n','', re.sub('\r','', self.text)).strip())
+            self.last_node.tail += text
 
         else:
-            self.current_node.text += unicode(re.sub('\n','', re.sub('\r','', self.text)).strip())
+            self.current_node.text += text
 
         self.text = u''
 
+    def fold_case(self):
+        # Store the lower case text and tail on every node once, for use in node selection
+        nlist = [self.root]
+        while len(nlist) > 0:
+            node = nlist.pop()
+            node.text_lower = node.text.lower()
+            node.tail_lower = node.tail.lower()
+            nlist.extend(node.children)
+
     def remove_text(self):
         if self.is_tail:
             self.text += self.current_node.tail
@@ -3413,10 +5217,20 @@ class JSONtree(DATAtree):
 # end JSONtree
 
 class DataTreeShell():
-    def __init__(self, data_def, data = None, warnaction = "default", warngoal = sys.stderr, caller_id = 0):
+    # A subclass can declare its add-on link and url functions (id > 99) as {id: "method_name"}
+    # A link method is called with (data, default), an url method with (data)
+    link_function_names = {}
+    url_function_names = {}
+
+    def __init__(self, data_def, data = None, warnaction = "default", warngoal = sys.stderr, caller_id = 0, cache_dir = None, shared_def = False):
+        # With cache_dir set, converted data_defs are stored there and reused
+        # With shared_def the converted data_def is a frozen one from data_def_registry,
+        # so its lists and dicts in for instance default values can not be changed
         self.tree_lock = RLock()
         with self.tree_lock:
-            self.dtc = DataTreeConstants()
+            self.dtc = dtc
+            self.cache_dir = cache_dir
+            self.shared_def = shared_def
             self.ddconv = DataDef_Convert(warnaction = warnaction , warngoal = warngoal, caller_id = caller_id)
             self.caller_id = caller_id
             self.print_tags = False
@@ -3431,8 +5245,25 @@ class DataTreeShell():
 
             self.searchtree = None
             self.timezone = pytz.utc
+            self.current_date = None
             self.errorcode = dte.dtDataInvalid
             self.result = []
+            # The conversion error counts of the last extraction as {(kind, def item): [count, example]}
+            self.error_counts = {}
+            # The process pool of extract_many and the data_def and shell state it was started with
+            self.page_pool = None
+            self.page_pool_def = None
+            self.page_pool_state = None
+            self.page_pool_workers = 0
+            # The "values" link_defs compiled by compile_link_defs
+            self.link_list = []
+            # The link and url function dispatch tables and with set_call_stats their [calls, seconds]
+            self.link_table = {}
+            self.url_table = {}
+            self.call_stats = None
+            self.url_data = None
+            # The "url-date-type" values per offset precomputed by get_url_plan
+            self.url_dates = None
             self.data_def = None
             self.init_data_def(data_def)
             if data != None:
@@ -3441,10 +5272,30 @@ class DataTreeShell():
     def init_data_def(self, data_def = None, init_start_node = True):
         with self.tree_lock:
             if is_data_value("dtversion", data_def, tuple):
-                self.data_def = data_def
                 if data_def["dtversion"] != self.ddconv.dtversion():
+                    # The converted layout can differ between versions
                     self.warn('Your supplied data_def was converted using version %d.%d.%d.\n' % data_def["dtversion"] + \
-                        'You best reconvert it with the current version.', dtdata_defWarning, 2)
+                        'Reconvert it with the current version.', dtdata_defWarning, 1)
+                    self.set_errorcode(dte.dtDataDefInvalid, True)
+                    return self.check_errorcode()
+
+                self.data_def = data_def
+
+            elif self.shared_def:
+                errorcode, cdata_def = data_def_registry.get(self.ddconv, data_def, self.cache_dir)
+                self.set_errorcode(errorcode)
+                if errorcode & dte.dtFatalError != dte.dtDataDefOK:
+                    return self.check_errorcode()
+
+                self.ddconv.cdata_def = cdata_def
+                self.data_def = cdata_def
+
+            elif self.cache_dir != None:
+                self.set_errorcode(self.ddconv.convert_cached(data_def, self.cache_dir))
+                if self.ddconv.errorcode & dte.dtFatalError != dte.dtDataDefOK:
+                    return self.check_errorcode()
+
+                self.data_def = self.ddconv.cdata_def
 
             else:
                 self.set_errorcode(self.ddconv.convert_data_def(data_def))
@@ -3455,6 +5306,7 @@ class DataTreeShell():
 
             self.set_timezone(self.data_def["tz"])
             self.empty_values = self.data_def['empty-values']
+            self.compile_link_defs()
             if isinstance(self.searchtree, DATAtree):
                 self.searchtree.check_data_def(self.data_def)
                 if init_start_node:
@@ -3576,159 +5428,268 @@ class DataTreeShell():
 
             return (url, encoding, accept_header, url_data, is_json)
 
-    def url_functions(self, urlid, data = None):
-        def url_warning(text, severity=2):
-            self.warn('%s on function: "%s": %s\n   Using url_data: %s' % \
-                (text, urlid, data, self.url_data), dtUrlWarning, severity, 3)
+    def get_url_plan(self, url_data_list):
+        # Return the get_url tuple (or None) for every url_data in url_data_list
+        # computing the date value for every offset they use only once
+        def date_keys(u_part):
+            if isinstance(u_part, (str, unicode)):
+                return []
+
+            urlid, data = u_part[0], u_part[1]
+            if urlid == 11:
+                return [data[0] if is_data_value(0, data, str) else 'offset']
+
+            if urlid == 14:
+                return [data[0] if is_data_value(0, data, str) else 'start',
+                        data[1] if is_data_value(1, data, str) else 'end']
+
+            return []
+
+        with self.tree_lock:
+            keys = set()
+            for u_part in list(self.data_def["url"]) + self.data_def["url-header"].values() + \
+                    self.data_def["url-data"].values():
+                keys.update(date_keys(u_part))
+
+            offsets = set()
+            for url_data in url_data_list:
+                for k in keys:
+                    offsets.add(data_value(k, url_data, int, default=0))
+
+            udt = self.data_def["url-date-type"]
+            udf = self.data_def["url-date-format"]
+            uwd = self.data_def["url-weekdays"]
+            self.url_dates = {}
+            for offset in offsets:
+                # A value that fails is left to url_date_value to warn on
+                try:
+                    dtordinal = self.current_ordinal + offset
+                    if udt == 0 and udf not in (None, ''):
+                        self.url_dates[offset] = datetime.date.fromordinal(dtordinal).strftime(udf)
+
+                    elif udt == 1:
+                        self.url_dates[offset] = self.url_timestamp(dtordinal)
+
+                    elif udt == 2 and len(uwd) == 7:
+                        self.url_dates[offset] = unicode(uwd[datetime.date.fromordinal(dtordinal).weekday()])
+
+                except:
+                    continue
 
-        def get_dtstring(dtordinal):
             try:
-                return datetime.date.fromordinal(dtordinal).strftime(udf)
+                return [self.get_url(url_data, False) for url_data in url_data_list]
 
-            except:
-                url_warning('Invalid "url-date-format"')
+            finally:
+                self.url_dates = None
 
-        def get_timestamp(dtordinal):
-            return int(time.mktime(datetime.date.fromordinal(dtordinal).timetuple())) * udm
+    def url_functions(self, urlid, data = None):
+        return self.get_url_function(urlid)(data)
 
-        def get_weekday(dtordinal):
-            wd = datetime.date.fromordinal(dtordinal).weekday()
-            if len(uwd) == 7:
-                return unicode(uwd[wd])
+    def get_url_function(self, urlid):
+        # Return the function(data) for url function urlid from the dispatch table
+        ufunc = self.url_table.get(urlid)
+        if ufunc == None:
+            ufunc = self.make_url_function(urlid)
+            self.url_table[urlid] = ufunc
 
-            url_warning('Invalid "url-weekdays"')
-            return unicode(wd)
+        return ufunc
 
+    def make_url_function(self, urlid):
+        # Resolve url function urlid to a function(data), taking a method declared
+        # in url_function_names or else add_on_url_functions for an id above 99
+        def unknown_error(data):
+            self.warn('Unknown Url Error on function: "%s": %s\n   Using url_data: %s\n%s' % \
+                (urlid, data, self.url_data, traceback.print_exc()), dtUrlWarning, 1)
+
+        builtins = {0: self.url_variable, 4: self.url_item_range, 11: self.url_date, 14: self.url_date_range}
+        if urlid > 99:
+            name = self.url_function_names.get(urlid)
+            if name != None:
+                add_on = getattr(self, name)
+
+            else:
+                add_on = lambda data: self.add_on_url_functions(urlid, data)
+
+            def ufunc(data):
+                try:
+                    retval = add_on(data)
+                    if retval in (None, ''):
+                        self.url_warning('No result on custom url function', urlid, data)
+
+                    return retval
+
+                except:
+                    unknown_error(data)
+
+        elif urlid in builtins.keys():
+            builtin = builtins[urlid]
+            def ufunc(data):
+                try:
+                    return builtin(urlid, data)
+
+                except:
+                    unknown_error(data)
+
+        else:
+            def ufunc(data):
+                self.url_warning('Unknown Url function', urlid, data)
+
+        if self.call_stats != None:
+            ufunc = self.count_calls(("url", urlid), ufunc)
+
+        return ufunc
+
+    def url_warning(self, text, urlid, data, severity=2):
+        self.warn('%s on function: "%s": %s\n   Using url_data: %s' % \
+            (text, urlid, data, self.url_data), dtUrlWarning, severity, 3)
+
+    def url_date_string(self, dtordinal, urlid, data):
         try:
-            if urlid > 99:
-                retval =  self.add_on_url_functions(urlid, data)
-                if retval in (None, ''):
-                    url_warning('No result on custom url function')
+            return datetime.date.fromordinal(dtordinal).strftime(self.data_def["url-date-format"])
 
-                return retval
+        except:
+            self.url_warning('Invalid "url-date-format"', urlid, data)
 
-            udt = self.data_def["url-date-type"]
-            udf = self.data_def["url-date-format"]
-            udm = self.data_def["url-date-multiplier"]
-            uwd = self.data_def["url-weekdays"]
-            rwd = self.data_def["url-relative-weekdays"]
-            if urlid == 0:
-                # Return the value of the given variable in data
-                # transposing a list or dict-key list to a comma separated list
-                if is_data_value(0, data, str):
-                    dkey = data[0]
+    def url_timestamp(self, dtordinal):
+        return int(time.mktime(datetime.date.fromordinal(dtordinal).timetuple())) * self.data_def["url-date-multiplier"]
 
-                else:
-                    dkey = 'url-var'
+    def url_weekday(self, dtordinal, urlid, data):
+        wd = datetime.date.fromordinal(dtordinal).weekday()
+        uwd = self.data_def["url-weekdays"]
+        if len(uwd) == 7:
+            return unicode(uwd[wd])
 
-                if is_data_value(dkey, self.url_data, str):
-                    return self.url_data[dkey]
+        self.url_warning('Invalid "url-weekdays"', urlid, data)
+        return unicode(wd)
 
-                elif is_data_value(dkey, self.url_data, list):
-                    cc = ''
-                    for c in self.url_data[dkey]:
-                        cc = u'%s,%s'% (cc, c)
+    def url_date_value(self, offset, urlid, data):
+        # Return the date string, timestamp or weekday for "url-date-type" 0, 1 or 2
+        if self.url_dates != None and offset in self.url_dates.keys():
+            return self.url_dates[offset]
 
-                    return cc[1:]
+        udt = self.data_def["url-date-type"]
+        if udt == 0:
+            return self.url_date_string(self.current_ordinal + offset, urlid, data)
 
-                elif is_data_value(dkey, self.url_data, dict):
-                    cc = ''
-                    for c in self.url_data[dkey].values():
-                        cc = u'%s,%s'% (cc, c)
+        elif udt == 1:
+            return self.url_timestamp(self.current_ordinal + offset)
 
-                    return cc[1:]
+        return self.url_weekday(self.current_ordinal + offset, urlid, data)
 
-                else:
-                    url_warning('No value found')
+    def url_variable(self, urlid, data):
+        # Return the value of the given variable in data
+        # transposing a list or dict-key list to a comma separated list
+        if is_data_value(0, data, str):
+            dkey = data[0]
 
-            elif urlid == 4:
-                # return a range from cnt_offset * cnt +1 to cnt_offset * cnt +cnt
-                cnt = data_value('count', self.url_data, int, default=self.data_def['default-item-count'])
-                cnt_offset = data_value('cnt-offset', self.url_data, int, default=0)
-                cstep = cnt_offset * cnt
-                splitter = self.data_def["item-range-splitter"]
-                return u'%s%s%s' % (cstep + 1, splitter, cstep  + cnt)
+        else:
+            dkey = 'url-var'
 
-            elif urlid == 11:
-                if is_data_value(0, data, str):
-                    dkey = data[0]
+        if is_data_value(dkey, self.url_data, str):
+            return self.url_data[dkey]
 
-                else:
-                    dkey = 'offset'
+        elif is_data_value(dkey, self.url_data, list):
+            cc = ''
+            for c in self.url_data[dkey]:
+                cc = u'%s,%s'% (cc, c)
 
-                offset = data_value(dkey, self.url_data, int, default=0)
-                if udt == 0:
-                    if udf not in (None, ''):
-                        return get_dtstring(self.current_ordinal + offset)
+            return cc[1:]
 
-                    else:
-                        return unicode(offset)
+        elif is_data_value(dkey, self.url_data, dict):
+            cc = ''
+            for c in self.url_data[dkey].values():
+                cc = u'%s,%s'% (cc, c)
 
-                elif udt == 1:
-                    return get_timestamp(self.current_ordinal + offset)
+            return cc[1:]
 
-                elif udt == 2:
-                    if offset in rwd.keys():
-                        return unicode(rwd[offset])
+        else:
+            self.url_warning('No value found', urlid, data)
+
+    def url_item_range(self, urlid, data):
+        # return a range from cnt_offset * cnt +1 to cnt_offset * cnt +cnt
+        cnt = data_value('count', self.url_data, int, default=self.data_def['default-item-count'])
+        cnt_offset = data_value('cnt-offset', self.url_data, int, default=0)
+        cstep = cnt_offset * cnt
+        splitter = self.data_def["item-range-splitter"]
+        return u'%s%s%s' % (cstep + 1, splitter, cstep  + cnt)
+
+    def url_date(self, urlid, data):
+        udt = self.data_def["url-date-type"]
+        udf = self.data_def["url-date-format"]
+        rwd = self.data_def["url-relative-weekdays"]
+        if is_data_value(0, data, str):
+            dkey = data[0]
 
-                    return get_weekday(self.current_ordinal + offset)
+        else:
+            dkey = 'offset'
 
-                else:
-                    url_warning('Invalid "url-date-type"')
+        offset = data_value(dkey, self.url_data, int, default=0)
+        if udt == 0:
+            if udf not in (None, ''):
+                return self.url_date_value(offset, urlid, data)
 
-            elif urlid == 14:
-                if is_data_value(0, data, str):
-                    startkey = data[0]
+            else:
+                return unicode(offset)
 
-                else:
-                    startkey = 'start'
+        elif udt == 1:
+            return self.url_date_value(offset, urlid, data)
 
-                start = data_value(startkey, self.url_data, int, default=0)
-                if is_data_value(1, data, str):
-                    endkey = data[1]
+        elif udt == 2:
+            if offset in rwd.keys():
+                return unicode(rwd[offset])
 
-                else:
-                    endkey = 'end'
+            return self.url_date_value(offset, urlid, data)
 
-                end = data_value(endkey, self.url_data, int, default=0)
-                if udt == 0:
-                    if udf not in (None, ''):
-                        start = get_dtstring(self.current_ordinal + start)
-                        end = get_dtstring(self.current_ordinal + end)
+        else:
+            self.url_warning('Invalid "url-date-type"', urlid, data)
 
-                    else:
-                        start = unicode(start)
-                        end = unicode(end)
+    def url_date_range(self, urlid, data):
+        udt = self.data_def["url-date-type"]
+        udf = self.data_def["url-date-format"]
+        rwd = self.data_def["url-relative-weekdays"]
+        if is_data_value(0, data, str):
+            startkey = data[0]
 
-                elif udt == 1:
-                    start = get_timestamp(self.current_ordinal + start)
-                    end = get_timestamp(self.current_ordinal + end)
+        else:
+            startkey = 'start'
 
-                elif udt == 2:
-                    if start in rwd.keys():
-                        start = unicode(rwd[start])
-                    else:
-                        start = get_weekday(self.current_ordinal + start)
+        start = data_value(startkey, self.url_data, int, default=0)
+        if is_data_value(1, data, str):
+            endkey = data[1]
 
-                    if end in rwd.keys():
-                        end = unicode(rwd[end])
-                    else:
-                        end = get_weekday(self.current_ordinal + end)
+        else:
+            endkey = 'end'
 
-                else:
-                    url_warning('Invalid "url-date-type"')
+        end = data_value(endkey, self.url_data, int, default=0)
+        if udt == 0:
+            if udf not in (None, ''):
+                start = self.url_date_value(start, urlid, data)
+                end = self.url_date_value(end, urlid, data)
+
+            else:
+                start = unicode(start)
+                end = unicode(end)
 
-                splitter = self.data_def["date-range-splitter"]
-                return '%s%s%s' % (start, splitter, end )
+        elif udt == 1:
+            start = self.url_date_value(start, urlid, data)
+            end = self.url_date_value(end, urlid, data)
 
+        elif udt == 2:
+            if start in rwd.keys():
+                start = unicode(rwd[start])
             else:
-                url_warning('Unknown Url function')
-                return None
+                start = self.url_date_value(start, urlid, data)
 
-        except:
-            self.warn('Unknown Url Error on function: "%s": %s\n   Using url_data: %s\n%s' % \
-                (urlid, data, self.url_data, traceback.print_exc()), dtUrlWarning, 1)
-            return None
+            if end in rwd.keys():
+                end = unicode(rwd[end])
+            else:
+                end = self.url_date_value(end, urlid, data)
+
+        else:
+            self.url_warning('Invalid "url-date-type"', urlid, data)
+
+        splitter = self.data_def["date-range-splitter"]
+        return '%s%s%s' % (start, splitter, end )
 
     def add_on_url_functions(self, urlid, data = None):
         pass
@@ -3819,7 +5780,7 @@ class DataTreeShell():
                 for subset in self.data_def["text_replace"]:
                     if isinstance(subset, list) and len(subset) >= 2:
                         try:
-                            data = re.sub(subset[0], subset[1], data, 0, re.DOTALL)
+                            data = regex_cache.compile(subset[0], re.DOTALL).sub(subset[1], data)
 
                         except:
                             self.set_errorcode(dte.dtTextReplaceFailed)
@@ -3828,7 +5789,7 @@ class DataTreeShell():
                 for ut in self.data_def["unquote_html"]:
                     if isinstance(ut, (str, unicode)):
                         try:
-                            data = re.sub(ut, unquote, data, 0, re.DOTALL)
+                            data = regex_cache.compile(ut, re.DOTALL).sub(unquote, data)
 
                         except:
                             self.set_errorcode(dte.dtUnquoteFailed)
@@ -3880,9 +5841,15 @@ class DataTreeShell():
 
             self.searchtree.fle = oldfobj
 
-    def extract_datalist(self, init_start_node = False):
+    def extract_datalist(self, init_start_node = False, workers = 1, batch_typing = False, columnar = False, skip_unused = False):
+        # With workers > 1 the key nodes are divided over that many forked processes
+        # With batch_typing the numeric value types are set per column after extraction
+        # With columnar self.result is a ColumnarResult instead of a list
+        # With skip_unused the values no "values" link_def uses are not searched and are
+        # left None in self.searchtree.result
         with self.tree_lock:
             self.result = []
+            self.error_counts = {}
             x = self.check_errorcode()
             if x:
                 self.warn('The searchtree has not (jet) been initialized.\n' + \
@@ -3895,64 +5862,250 @@ class DataTreeShell():
                 if x:
                     return x
 
-            self.set_errorcode(self.searchtree.extract_datalist(), True)
-            if not self.check_errorcode():
-                if self.is_data_value("values", dict) and isinstance(self.searchtree.result, list):
-                    for keydata in self.searchtree.result:
-                        self.result.append(self.link_values(keydata))
+            if self.is_data_value("values", dict) and columnar and workers <= 1:
+                # Link straight into the columns, reusing one dict for all rows
+                self.set_errorcode(self.searchtree.extract_datalist(workers = workers, \
+                    batch_typing = batch_typing, skip_unused = skip_unused), True)
+                if not self.check_errorcode():
+                    self.result = ColumnarResult(self.data_def["values"].keys())
+                    values = {}
+                    for tlist in self.searchtree.result:
+                        self.result.append_dict(self.link_values(tlist, values))
+
+            elif self.is_data_value("values", dict):
+                self.set_errorcode(self.searchtree.extract_datalist(workers = workers, \
+                    link_function = self.link_values, batch_typing = batch_typing, skip_unused = skip_unused), True)
+                if not self.check_errorcode():
+                    self.result = self.searchtree.link_result
+                    if columnar:
+                        self.result = ColumnarResult(self.data_def["values"].keys())
+                        for values in self.searchtree.link_result:
+                            self.result.append_dict(values)
 
-                else:
+            else:
+                self.set_errorcode(self.searchtree.extract_datalist(workers = workers, batch_typing = batch_typing), True)
+                if not self.check_errorcode():
                     self.warn('No valid "values" keyword found or no data retrieved to process', dtDataWarning, 2)
-                    self.result = self.searchtree.result
+                    self.result = self.searchtree.columnar_result() if columnar else self.searchtree.result
 
+            self.error_counts = self.searchtree.error_counts
             return self.check_errorcode()
 
-    def link_values(self, linkdata):
-        """
-        Following the definition in the values definition.
-        Her the data-list for every keyword
-        retreived with the DataTree module is validated and linked to keywords
-        A dict is return
-        """
-        def get_variable(vdef, key):
-            varid = vdef[1][0]
-            if  varid >= len(linkdata):
-                self.warn('Requested datavalue "%s" does not exist in: %s'% (varid, linkdata), dtLinkWarning, 2)
+    def iter_datalist(self, init_start_node = False, skip_unused = False):
+        # A generator yielding the linked values dict (or without "values" the value list)
+        # of every key node as soon as it is extracted, so only one is held at a time.
+        # It honours the quit flag and the progress_queue of the searchtree and can be stopped
+        # with close(). self.error_counts is set when it ends. skip_unused is as with extract_datalist.
+        with self.tree_lock:
+            self.error_counts = {}
+            x = self.check_errorcode()
+            if x:
+                self.warn('The searchtree has not (jet) been initialized.\n' + \
+                    'Run .init_data() first with a valid dataset', dtDataWarning, 1)
                 return
 
-            # remove any leading or trailing spaces on a string/unicode value
-            value = linkdata[varid] if (not  isinstance(linkdata[varid], (unicode, str))) else unicode(linkdata[varid]).strip()
-            return process_extras(value, vdef, key)
+            if init_start_node:
+                self.set_errorcode(self.searchtree.find_start_node(), True)
+                if self.check_errorcode():
+                    return
+
+            searchtree = self.searchtree
+            linked = self.is_data_value("values", dict)
+
+        try:
+            for tlist in searchtree.iter_datalist(skip_unused = (linked and skip_unused)):
+                yield self.link_values(tlist) if linked else tlist
+
+        finally:
+            self.error_counts = searchtree.error_counts
+
+    def extract_page(self, data, batch_typing = False, columnar = False):
+        # init_data and extract_datalist on one page, returning (errorcode, result)
+        with self.tree_lock:
+            errorcode = self.init_data(data)
+            if errorcode != dte.dtDataOK:
+                return (errorcode, [])
+
+            errorcode = self.extract_datalist(batch_typing = batch_typing, columnar = columnar)
+            return (errorcode, self.result)
+
+    def extract_many(self, pages, workers = 1, batch_typing = False, columnar = False):
+        # A generator extracting an iterable of (page_id, data) pairs, yielding
+        # (page_id, errorcode, result) as each page finishes, with workers > 1 in any order.
+        # The worker processes are kept for the next call until close_page_pool(). Each holds
+        # an instance of this shell class, created once on the converted data_def, so the class
+        # must be importable and its __init__ must accept the DataTreeShell arguments.
+        pool = self.get_page_pool(workers) if workers > 1 else None
+        if pool == None:
+            for page_id, data in pages:
+                errorcode, result = self.extract_page(data, batch_typing, columnar)
+                yield (page_id, errorcode, result)
+
+            return
+
+        jobs = ((page_id, data, batch_typing, columnar) for page_id, data in pages)
+        for page_id, errorcode, result, messages, failure in pool.imap_unordered(_extract_page, jobs):
+            for msg in messages:
+                sys.modules['DataTreeGrab']._warnings.warngoal.put(msg)
+
+            if failure != None:
+                self.warn('Extraction of page %s failed:\n%s' % (page_id, failure), dtDataWarning, 1)
+
+            yield (page_id, errorcode, result)
+
+    def get_page_pool(self, workers):
+        # Return the extract_many pool, (re)starting it on a new data_def, shell state
+        # or number of workers or None if it can not be used
+        with self.tree_lock:
+            state = self.get_page_state()
+            if self.page_pool != None and self.page_pool_def is self.data_def \
+              and self.page_pool_state == state and self.page_pool_workers == workers:
+                return self.page_pool
+
+            self.close_page_pool()
+            shell_class = self.__class__
+            if getattr(sys.modules.get(shell_class.__module__), shell_class.__name__, None) is not shell_class:
+                self.warn('%s is not importable, so the pages are extracted in this process' % \
+                    (shell_class.__name__, ), dtDataWarning, 2)
+                return None
+
+            warnings = sys.modules['DataTreeGrab']._warnings
+            initargs = (shell_class, self.data_def, state, self.caller_id, warnings.defaultaction,
+                list(warnings.filters), isinstance(warnings.warngoal, Queue))
+            # Make sure no other thread holds a lock the workers need while forking
+            with _ForkLocks(self.tree_lock, self.ddconv.tree_lock):
+                self.page_pool = multiprocessing.Pool(workers, _init_page_worker, initargs)
+
+            self.page_pool_def = self.data_def
+            self.page_pool_state = state
+            self.page_pool_workers = workers
+            return self.page_pool
+
+    def get_page_state(self):
+        # The shell settings an extract_many worker needs to extract like this shell
+        with self.tree_lock:
+            return {"timezone": self.timezone,
+                    "current_date": self.current_date,
+                    "print_tags": self.print_tags,
+                    "print_searchtree": self.print_searchtree,
+                    "show_result": self.show_result}
+
+    def set_page_state(self, state):
+        with self.tree_lock:
+            self.set_timezone(state["timezone"])
+            self.set_current_date(state["current_date"])
+            self.print_tags = state["print_tags"]
+            self.print_searchtree = state["print_searchtree"]
+            self.show_result = state["show_result"]
 
-        def process_link_function(vdef, key):
+    def close_page_pool(self):
+        with self.tree_lock:
+            if self.page_pool != None:
+                self.page_pool.terminate()
+                self.page_pool.join()
+
+            self.page_pool = None
+            self.page_pool_def = None
+            self.page_pool_state = None
+            self.page_pool_workers = 0
+
+    def compile_link_defs(self):
+        # Compile every "values" link_def into a function on the data-list, so link_values
+        # does not decode the link_def flags again for every key node
+        with self.tree_lock:
+            self.link_list = []
+            for k, v in data_value("values", self.data_def, dict).items():
+                default = v[self.dtc.linkPos[self.dtc.linkhasDefault]] if len(v) > 2 else None
+                self.link_list.append((k, self.compile_link_def(v, k), default))
+
+    def compile_link_def(self, vdef, key):
+        # Return a function returning the value vdef gives on a data-list
+        lact = vdef[0] & self.dtc.linkGroup
+        if lact == self.dtc.linkVarID:
+            varid = vdef[1][0]
+            extras = self.compile_link_extras(vdef, key)
+            def get_variable(linkdata):
+                if  varid >= len(linkdata):
+                    self.warn('Requested datavalue "%s" does not exist in: %s'% (varid, linkdata), dtLinkWarning, 2)
+                    return
+
+                # remove any leading or trailing spaces on a string/unicode value
+                value = linkdata[varid] if (not  isinstance(linkdata[varid], (unicode, str))) else unicode(linkdata[varid]).strip()
+                return extras(value)
+
+            return get_variable
+
+        elif lact == self.dtc.linkFuncID:
+            extras = self.compile_link_extras(vdef, key)
+            empty_values = self.empty_values
             funcid = vdef[1][0]
             default = vdef[self.dtc.linkPos[self.dtc.linkhasDefault]]
-            # Process the datavalues given for the function
-            data = []
-            for fd in vdef[1][1]:
-                lact = fd[0] & self.dtc.linkGroup
-                if lact == self.dtc.linkVarID:
-                    data.append(get_variable(fd, key))
+            if getattr(self.link_functions, 'im_func', None) is DataTreeShell.link_functions.im_func:
+                if vdef[0] & self.dtc.linkFolded:
+                    # Evaluated on conversion
+                    value = vdef[1][2]
+                    def get_folded(linkdata):
+                        if value in empty_values:
+                            return None
 
-                elif lact == self.dtc.linkFuncID:
-                    data.append(process_link_function(fd, key))
+                        return extras(value)
 
-                elif lact == self.dtc.linkValue:
-                    data.append(fd[1])
+                    return get_folded
 
-            # And call the linkfunction
-            value = self.link_functions(funcid, data, default)
-            if value in self.empty_values:
-                return None
+                link_function = self.get_link_function(funcid)
 
-            return process_extras(value, vdef, key)
+            else:
+                # A subclass replaced link_functions, so a folded value is not used
+                link_function = lambda data, default: self.link_functions(funcid, data, default)
 
-        def process_extras(value, vdef, key):
-            if not value in self.empty_values:
-                if vdef[0] & self.dtc.linkhasRegex and isinstance(value, (str, unicode)):
-                    search_regex = vdef[self.dtc.linkPos[self.dtc.linkhasRegex]]
+            # Process the datavalues given for the function
+            data_functions = [self.compile_link_def(fd, key) for fd in vdef[1][1] \
+                if fd[0] & self.dtc.linkGroup != self.dtc.linkNone]
+            def process_link_function(linkdata):
+                value = link_function([f(linkdata) for f in data_functions], default)
+                if value in empty_values:
+                    return None
+
+                return extras(value)
+
+            return process_link_function
+
+        elif lact == self.dtc.linkValue:
+            value = vdef[1]
+            return lambda linkdata: value
+
+        return lambda linkdata: None
+
+    def compile_link_extras(self, vdef, key):
+        # Return a function applying the "regex", "type", "calc", "max length"
+        # and "min length" of the link_def vdef to a value
+        vtype = {
+                self.dtc.typeString: ("String", unicode),
+                self.dtc.typeLower: ("LowerCase", lambda value: unicode(value).lower()),
+                self.dtc.typeUpper: ("UpperCase", lambda value: unicode(value).upper()),
+                self.dtc.typeCapitalize: ("Capitalize", lambda value: unicode(value).capitalize()),
+                self.dtc.typeInteger: ("Integer", int),
+                self.dtc.typeFloat: ("Float", float),
+                self.dtc.typeBoolean: ("Boolean", bool)}
+        empty_values = self.empty_values
+        default = vdef[self.dtc.linkPos[self.dtc.linkhasDefault]]
+        search_regex = vdef[self.dtc.linkPos[self.dtc.linkhasRegex]] if vdef[0] & self.dtc.linkhasRegex else None
+        dtype = vdef[self.dtc.linkPos[self.dtc.linkhasType]] if vdef[0] & self.dtc.linkhasType else None
+        calc_list = vdef[self.dtc.linkPos[self.dtc.linkhasCalc]] if vdef[0] & self.dtc.linkhasCalc else ()
+        max_length = vdef[self.dtc.linkPos[self.dtc.linkhasMax]] if vdef[0] & self.dtc.linkhasMax else None
+        min_length = vdef[self.dtc.linkPos[self.dtc.linkhasMin]] if vdef[0] & self.dtc.linkhasMin else None
+        try:
+            regex = regex_cache.compile(search_regex, re.DOTALL) if search_regex != None else None
+
+        except:
+            # Warned on use
+            regex = None
+
+        def process_extras(value):
+            if not value in empty_values:
+                if search_regex != None and isinstance(value, (str, unicode)):
                     try:
-                        dd = re.search(search_regex, value, re.DOTALL)
+                        dd = regex.search(value)
                         if dd.group(1) not in ('', None):
                             value = dd.group(1)
 
@@ -3966,381 +6119,185 @@ class DataTreeShell():
                             (value, search_regex, vdef), dtLinkWarning, 4)
                         value = None
 
-                if vdef[0] & self.dtc.linkhasType:
-                    dtype = vdef[self.dtc.linkPos[self.dtc.linkhasType]]
+                if dtype in vtype.keys():
                     try:
-                        if dtype == self.dtc.typeString:
-                            value = unicode(value)
-
-                        elif dtype == self.dtc.typeLower:
-                            value = unicode(value).lower()
-
-                        elif dtype == self.dtc.typeUpper:
-                            value = unicode(value).upper()
-
-                        elif dtype == self.dtc.typeCapitalize:
-                            value = unicode(value).capitalize()
-
-                        elif dtype == self.dtc.typeInteger:
-                            value = int(value)
-
-                        elif dtype == self.dtc.typeFloat:
-                            value = float(value)
-
-                        elif dtype == self.dtc.typeBoolean:
-                            value = bool(value)
+                        value = vtype[dtype][1](value)
 
                     except:
-                        vtype = {
-                                self.dtc.typeString: "String",
-                                self.dtc.typeLower: "LowerCase",
-                                self.dtc.typeUpper: "UpperCase",
-                                self.dtc.typeCapitalize: "Capitalize",
-                                self.dtc.typeInteger: "Integer",
-                                self.dtc.typeFloat: "Float",
-                                self.dtc.typeBoolean: "Boolean"}
-                        self.warn('Error on applying type "%s" on "%s"'% (vtype[dtype], value), dtLinkWarning, 4)
+                        self.warn('Error on applying type "%s" on "%s"'% (vtype[dtype][0], value), dtLinkWarning, 4)
                         value = None
 
-                if vdef[0] & self.dtc.linkhasCalc:
-                    for cv in vdef[self.dtc.linkPos[self.dtc.linkhasCalc]]:
-                        if cv[0] == self.dtc.calcMultiply:
-                            try:
-                                if not isinstance(value, (int, float)):
-                                    value = float(value)
-                                value = value * cv[1]
+                for cv in calc_list:
+                    if cv[0] == self.dtc.calcMultiply:
+                        try:
+                            if not isinstance(value, (int, float)):
+                                value = float(value)
+                            value = value * cv[1]
 
-                            except:
-                                self.warn('Error on applying multiplier "%s" on "%s"'% \
-                                    (cv[1], value), dtLinkWarning, 4)
+                        except:
+                            self.warn('Error on applying multiplier "%s" on "%s"'% \
+                                (cv[1], value), dtLinkWarning, 4)
 
-                        if cv[0] == self.dtc.calcDivide:
-                            try:
-                                if not isinstance(value, (int, float)):
-                                    value = float(value)
-                                value = value / cv[1]
+                    if cv[0] == self.dtc.calcDivide:
+                        try:
+                            if not isinstance(value, (int, float)):
+                                value = float(value)
+                            value = value / cv[1]
 
-                            except:
-                                self.warn('Error on applying divider "%s" on "%s"'% \
-                                    (cv[1], value), dtLinkWarning, 4)
+                        except:
+                            self.warn('Error on applying divider "%s" on "%s"'% \
+                                (cv[1], value), dtLinkWarning, 4)
 
-                if vdef[0] & self.dtc.linkhasMax:
-                    if isinstance(value, (str, unicode, list, dict)) and len(value) > vdef[self.dtc.linkPos[self.dtc.linkhasMax]]:
+                if max_length != None:
+                    if isinstance(value, (str, unicode, list, dict)) and len(value) > max_length:
                         self.warn('Requested datavalue "%s" is longer then %s'% \
-                            (key, vdef[self.dtc.linkPos[self.dtc.linkhasMax]]), dtLinkWarning, 4)
+                            (key, max_length), dtLinkWarning, 4)
                         value = None
 
-                    if isinstance(value, (int, float)) and value > vdef[self.dtc.linkPos[self.dtc.linkhasMax]]:
+                    if isinstance(value, (int, float)) and value > max_length:
                         self.warn('Requested datavalue "%s" is bigger then %s'% \
-                            (key, vdef[self.dtc.linkPos[self.dtc.linkhasMax]]), dtLinkWarning, 4)
+                            (key, max_length), dtLinkWarning, 4)
                         value = None
 
-                if vdef[0] & self.dtc.linkhasMin:
-                    if isinstance(value, (str, unicode, list, dict)) and len(value) < vdef[self.dtc.linkPos[self.dtc.linkhasMin]]:
+                if min_length != None:
+                    if isinstance(value, (str, unicode, list, dict)) and len(value) < min_length:
                         self.warn('Requested datavalue "%s" is shorter then %s'% \
-                            (key, vdef[self.dtc.linkPos[self.dtc.linkhasMin]]), dtLinkWarning, 4)
+                            (key, min_length), dtLinkWarning, 4)
                         value = None
 
-                    if isinstance(value, (int, float)) and value < vdef[self.dtc.linkPos[self.dtc.linkhasMin]]:
+                    if isinstance(value, (int, float)) and value < min_length:
                         self.warn('Requested datavalue "%s" is smaller then %s'% \
-                            (key, vdef[self.dtc.linkPos[self.dtc.linkhasMin]]), dtLinkWarning, 4)
+                            (key, min_length), dtLinkWarning, 4)
                         value = None
 
-            if value in self.empty_values:
-                return vdef[self.dtc.linkPos[self.dtc.linkhasDefault]]
+            if value in empty_values:
+                return default
 
             return value
 
-        values = {}
-        if isinstance(linkdata, list):
-            for k, v in self.data_def["values"].items():
-                lact = v[0] & self.dtc.linkGroup
-                cval = None
-                if lact == self.dtc.linkVarID:
-                    cval = get_variable(v, k)
+        return process_extras
 
-                elif lact == self.dtc.linkFuncID:
-                    cval = process_link_function(v, k)
+    def link_values(self, linkdata, values = None):
+        """
+        Following the definition in the values definition.
+        Her the data-list for every keyword
+        retreived with the DataTree module is validated and linked to keywords
+        A dict is return. If given, values is cleared and filled instead of a new dict
+        """
+        if values == None:
+            values = {}
 
-                elif lact == self.dtc.linkValue:
-                    cval = v[1]
+        else:
+            values.clear()
 
-                if not cval in self.empty_values:
+        if isinstance(linkdata, list):
+            empty_values = self.empty_values
+            for k, link_function, default in self.link_list:
+                cval = link_function(linkdata)
+                if not cval in empty_values:
                     values[k] = cval
 
-                elif not v[self.dtc.linkPos[self.dtc.linkhasDefault]] in self.empty_values:
-                    values[k] = v[self.dtc.linkPos[self.dtc.linkhasDefault]]
+                elif not default in empty_values:
+                    values[k] = default
+
         else:
             self.warn('No valid data "%s" to link with' % (linkdata, ), dtLinkWarning, 2)
 
         return values
 
     def link_functions(self, fid, data = None, default = None):
-        def link_warning(text, severity=4):
-            self.warn('%s on function: "%s"\n   Using link_data: %s' % (text, fid, data), dtLinkWarning, severity, 3)
-
-        try:
-            if fid > 99:
-                retval = self.add_on_link_functions(fid, data, default)
-                if is_data_value("fid", retval, int) and (0 <= retval["fid"] < 13):
-                    # it is redirected to a base function
-                    fid = retval["fid"]
-
-                else:
-                    if fid < 200 and retval in self.empty_values:
-                        self.warn('No result on custom link function: "%s"\n' % (fid, ) + \
-                            '   Using link_data: %s' % (data, ), dtLinkWarning, 4)
-
-                    return retval
-
-            # strip data[1] from the end of data[0] if present and make sure it's unicode
-            if fid == 0:
-                if not is_data_value(0, data, str):
-                    link_warning('Missing or invalid data value 0')
-                    if default != None:
-                        return default
-
-                    return u''
-
-                if is_data_value(1, data, str) and data[0].strip().lower()[-len(data[1]):] == data[1].lower():
-                    return unicode(data[0][:-len(data[1])]).strip()
-
-                else:
-                    return unicode(data[0]).strip()
+        return self.get_link_function(fid)(data, default)
 
-            # strip data[1] from the start of data[0] if present and make sure it's unicode
-            elif fid == 1:
-                if not is_data_value(0, data, str):
-                    link_warning('Missing or invalid data value 0')
-                    if default != None:
-                        return default
+    def get_link_function(self, fid):
+        # Return the function(data, default) for link function fid from the dispatch table
+        lfunc = self.link_table.get(fid)
+        if lfunc == None:
+            lfunc = self.make_link_function(fid)
+            self.link_table[fid] = lfunc
 
-                    return u''
-
-                if is_data_value(1, data, str) and data[0].strip().lower()[:len(data[1])] == data[1].lower():
-                    return unicode(data[0][len(data[1]):]).strip()
-
-                else:
-                    return unicode(data[0]).strip()
-
-            # concatenate stringparts and make sure it's unicode
-            elif fid == 2:
-                dd = u''
-                for d in data:
-                    if d != None:
-                        try:
-                            dd += unicode(d)
-
-                        except:
-                            link_warning('Invalid data value')
-                            continue
-
-                return dd
-
-            # get 1 or more parts of a path
-            elif fid == 3:
-                if is_data_value(0, data, str):
-                    dd = data[0].split('/')
-
-                    if is_data_value(1, data, int):
-                        if data[1] < len(dd):
-                            return dd[data[1]]
-
-                        else:
-                            link_warning('Missing or invalid data value 1')
-
-                    elif is_data_value(1, data, list):
-                        rval = u''
-                        for dpart in data[1]:
-                            if isinstance(dpart, int) and dpart < len(dd):
-                                rval = u'%s/%s' % (rval, dpart)
-
-                            else:
-                                link_warning('Missing or invalid data value in list 1')
-
-                        if len(rval) == 0:
-                            return rval
-
-                        else:
-                            return rval[1:]
-
-                else:
-                    link_warning('Missing or invalid data value 0')
-
-                if default == None:
-                    return u''
-
-                else:
-                    return default
-
-            # Combine a date and time value
-            elif fid == 4:
-                if not is_data_value(0, data, datetime.date):
-                    if is_data_value(4, data, datetime.date):
-                        data[0] = data[4]
-
-                    else:
-                        data[0] = self.current_date
+        return lfunc
 
-                if not(is_data_value(0, data, datetime.date) \
-                  and is_data_value(1, data, datetime.time) \
-                  and is_data_value(2, data, int)):
-                    link_warning('Missing or invalid date and/or time values')
-                    return default
+    def make_link_function(self, fid):
+        # Resolve link function fid to a function(data, default), taking a method declared
+        # in link_function_names or else add_on_link_functions for an id above 99
+        def call_builtin(bfid, data, default):
+            def link_warning(text, severity=4):
+                self.warn('%s on function: "%s"\n   Using link_data: %s' % (text, bfid, data), dtLinkWarning, severity, 3)
 
-                dtm = self.timezone.localize(datetime.datetime.combine(data[0], data[1]))
-                dtm = pytz.utc.normalize(dtm.astimezone(pytz.utc))
-                if is_data_value(3, data, datetime.time):
-                    # We check if this time is after the first and if so we assume a midnight passing
-                    dc = self.timezone.localize(datetime.datetime.combine(data[0], data[1]))
-                    dc = pytz.utc.normalize(dc.astimezone(pytz.utc))
-                    if dc > dtm:
-                        data[0] += datetime.timedelta(days = 1)
-                        dtm = self.timezone.localize(datetime.datetime.combine(data[0], data[1]))
-                        dtm = pytz.utc.normalize(dtm.astimezone(pytz.utc))
+            return builtin_link_function(bfid, data, default, link_warning, self.current_date, self.timezone)
 
-                return dtm
-
-            # Return True (or data[2]) if data[1] is present in data[0], else False (or data[3])
-            elif fid == 5:
-                if is_data_value(0, data, str) and is_data_value(1, data, str) and data[1].lower() in data[0].lower():
-                    return data_value(2, data, default = True)
-
-                return data_value(3, data, default = False)
-
-            # Compare the values 1 and 2 returning 3 (or True) if equal, 4 (or False) if unequal and 5 (or None) if one of them is None
-            elif fid == 6:
-                if not is_data_value(0, data, None, True) or not is_data_value(1, data, None, True):
-                    return data_value(4, data, default = None)
-
-                elif data[0] == data[1]:
-                    return data_value(2, data, default = True)
-
-                return data_value(3, data, default = False)
-
-            # Return a string on value True
-            elif fid == 7:
-                if is_data_value(0, data, bool):
-                    if data[0] and is_data_value(1, data):
-                        return data[1]
-
-                    elif not data[0] and is_data_value(2, data):
-                        return data[2]
-
-                    else:
-                        link_warning('Missing return values 1 and or 2')
-
-                link_warning('No boolean value 0')
-                return default
-
-            # Return the longest not empty text value
-            elif fid == 8:
-                text = default if isinstance(default, (str, unicode)) else u''
-                if len(data) == 0:
-                    link_warning('Missing data values')
-                    return text
-
-                for item in range(len(data)):
-                    if is_data_value(item, data, str):
-                        if len(data[item]) > len(text):
-                            text = unicode(data[item].strip())
-
-                return text
-
-            # Return the first not empty value
-            elif fid == 9:
-                if len(data) == 0:
-                    link_warning('Missing data values')
-                    return default
-
-                for item in data:
-                    if (isinstance(item, (str, unicode, list, tuple, dict)) and len(item) > 0) or \
-                      (not isinstance(item, (str, unicode, list, tuple, dict)) and item != None):
-                        return item
-
-            # look for item 2 in list 0 and return the corresponding value in list1, If not found return item 3 (or None)
-            elif fid == 10:
-                if len(data) < 3 :
-                    link_warning('Missing data values (min. 3)')
-                    return default
-
-                if not isinstance(data[0], (list,tuple)):
-                    data[0] = [data[0]]
-
-                for index in range(len(data[0])):
-                    if isinstance(data[0][index], (str, unicode)):
-                        data[0][index] = data[0][index].lower().strip()
-
-                if not isinstance(data[1], (list,tuple)):
-                    data[1] = [data[1]]
-
-                sd = data[2].lower().strip() if isinstance(data[2], (str, unicode)) else data[2]
-
-                if sd in data[0]:
-                    index = data[0].index(sd)
-                    if index < len(data[1]):
-                        return data[1][index]
-
-                if len(data) > 3 :
-                    return data[3]
+        def unknown_error(data, default):
+            self.warn('Unknown link Error on function: "%s"\n' % (fid, ) + \
+                    '   Using link_data: %s\n%s' % (data, traceback.print_exc()), dtLinkWarning, 2)
+            return default
 
-                link_warning('Item 2 not found in list 0 or list 1 to short')
-                return default
+        if fid > 99:
+            name = self.link_function_names.get(fid)
+            if name != None:
+                add_on = getattr(self, name)
 
-            # look for item 1 in the keys from dict 0 and return the corresponding value
-            elif fid == 11:
-                if len(data) < 2:
-                    link_warning('Missing data values (min. 2)')
-                    return default
+            else:
+                add_on = lambda data, default: self.add_on_link_functions(fid, data, default)
 
-                if is_data_value(0, data, dict):
-                    data[0] =[data[0]]
+            def lfunc(data, default):
+                try:
+                    retval = add_on(data, default)
+                    if is_data_value("fid", retval, int) and (0 <= retval["fid"] < 13):
+                        # it is redirected to a base function
+                        return call_builtin(retval["fid"], data, default)
 
-                if not is_data_value(1, data, list):
-                    data[1] = [data[1]]
+                    if fid < 200 and retval in self.empty_values:
+                        self.warn('No result on custom link function: "%s"\n' % (fid, ) + \
+                            '   Using link_data: %s' % (data, ), dtLinkWarning, 4)
 
-                if is_data_value(0, data, list):
-                    for item in data[1]:
-                        if isinstance(item, (str,unicode)):
-                            item = item.lower()
+                    return retval
 
-                        for sitem in data[0]:
-                            if isinstance(sitem, dict):
-                                if item in sitem.keys():
-                                    if isinstance(sitem[item], (list, tuple)) and len(sitem[item]) == 0:
-                                        continue
+                except:
+                    return unknown_error(data, default)
 
-                                    if isinstance(sitem[item], (list, tuple)) and len(sitem[item]) == 1:
-                                        return sitem[item][0]
+        else:
+            def lfunc(data, default):
+                try:
+                    return call_builtin(fid, data, default)
 
-                                    return sitem[item]
+                except:
+                    return unknown_error(data, default)
 
-                link_warning('Item 1 not found in dict 0')
-                return default
+        if self.call_stats != None:
+            lfunc = self.count_calls(("link", fid), lfunc)
 
-            # remove data[1] from the string in data[0] if present and make sure it's unicode
-            elif fid == 12:
-                if not is_data_value(0, data, str):
-                    link_warning('Missing or invalid data value 0')
-                    if default != None:
-                        return default
+        return lfunc
 
-                    return u''
+    def count_calls(self, key, func):
+        # Wrap func to add its calls and their time to self.call_stats[key]
+        stats = self.call_stats.setdefault(key, [0, 0.0])
+        def counted(*args):
+            start = time.time()
+            try:
+                return func(*args)
 
-                if is_data_value(1, data, str) and data[1] in data[0]:
-                    re.sub('  ', ' ', re.sub(data[1], '', data[0]))
+            finally:
+                stats[0] += 1
+                stats[1] += time.time() - start
 
-                else:
-                    return unicode(data[0]).strip()
+        return counted
 
-            else:
-                link_warning('Unknown link function',2)
-                return None
+    def set_call_stats(self, enable = True):
+        # Start (again) or stop counting the calls and time per link and url function
+        with self.tree_lock:
+            self.call_stats = {} if enable else None
+            self.link_table = {}
+            self.url_table = {}
+            if self.data_def != None:
+                self.compile_link_defs()
+
+    def get_call_stats(self):
+        # Return {("link"|"url", id): {"calls": n, "time": seconds}}
+        with self.tree_lock:
+            if self.call_stats == None:
+                return {}
 
-        except:
-            self.warn('Unknown link Error on function: "%s"\n' % (fid, ) + \
-                    '   Using link_data: %s\n%s' % (data, traceback.print_exc()), dtLinkWarning, 2)
-            return default
+            return dict([(k, {"calls": v[0], "time": v[1]}) for k, v in self.call_stats.items()])
 
     def add_on_link_functions(self, fid, data = None, default = None):
         pass
@@ -4405,6 +6362,48 @@ class DataTreeShell():
         return data_value(searchpath, self.data_def, dtype, default)
 # end DataTreeShell()
 
+_page_shell = None
+def _init_page_worker(shell_class, data_def, state, caller_id, warnaction, filters, collect_warnings):
+    """Create the shell an extract_many worker process extracts its pages with"""
+    global _page_shell
+    _reset_fork_locks()
+    _page_shell = shell_class(data_def, warnaction = warnaction, caller_id = caller_id)
+    _page_shell.set_page_state(state)
+    warnings = sys.modules['DataTreeGrab']._warnings
+    with warnings.warn_lock:
+        # Keep the rules of the parent process
+        warnings.filters[:] = filters
+        warnings.wants_cache = {}
+        if collect_warnings:
+            warnings.warngoal = Queue()
+# end _init_page_worker()
+
+def _extract_page(job):
+    """
+    Extract one page in an extract_many worker process returning
+    (page_id, errorcode, result, warnings, failure)
+    """
+    page_id, data, batch_typing, columnar = job
+    failure = None
+    try:
+        errorcode, result = _page_shell.extract_page(data, batch_typing, columnar)
+
+    except:
+        errorcode, result = dte.dtUnknownError, []
+        failure = traceback.format_exc()
+
+    messages = []
+    warngoal = sys.modules['DataTreeGrab']._warnings.warngoal
+    while isinstance(warngoal, Queue):
+        try:
+            messages.append(warngoal.get_nowait())
+
+        except Empty:
+            break
+
+    return (page_id, errorcode, result, messages, failure)
+# end _extract_page()
+
 if __name__ == '__main__':
     if version()[6]:
         sys.stdout.write('%s-%s.%s.%s-p%s alfa\n' % (version()[0],version()[1],version()[2],version()[3],version()[4]))
@@ -40,7 +40,7 @@ setup(
     name = version()[0],
     version = __version__,
     description = 'Node-Tree based data extraction',
-    py_modules = ['DataTreeGrab', 'test_json_struct'],
+    py_modules = ['DataTreeGrab', 'DataTreeFetch', 'test_json_struct'],
     scripts=['test_data_def.py'],
     requires = ['pytz'],
     provides = ['%s (%s.%s)' % (version()[0], version()[1], version()[2])],
@@ -0,0 +1,130 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# DataTreeFetch against a local http server
+# Run with: python2 -m unittest discover tests
+
+from __future__ import unicode_literals
+import sys, os, time, unittest, threading, BaseHTTPServer, SocketServer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import DataTreeGrab, DataTreeFetch
+from DataTreeGrab import dte
+
+class PageHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    active = 0
+    max_active = 0
+    count_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Count the open requests until the response is sent
+        cls = self.__class__
+        with cls.count_lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+
+        if self.path.startswith('/page/'):
+            n = int(self.path.split('/')[-1])
+            time.sleep(0.05)
+            status, body = (200, ('{"items":[{"n":%s,"t":"p%s"},{"n":%s,"t":"q"}]}' % (n, n, n + 100)).encode('utf-8'))
+
+        elif self.path.startswith('/slow'):
+            time.sleep(1.5)
+            status, body = (200, b'{}')
+
+        else:
+            status, body = (404, b'')
+
+        with cls.count_lock:
+            cls.active -= 1
+
+        self.send_body(status, body)
+
+class PageServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # A client that timed out has closed the connection
+        pass
+
+class TestPageFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = PageServer(('127.0.0.1', 0), PageHandler)
+        cls.server_thread = threading.Thread(target = cls.server.serve_forever)
+        cls.server_thread.daemon = True
+        cls.server_thread.start()
+        cls.data_def = {
+            "data-format": "json",
+            "url": ["http://127.0.0.1:%s/" % cls.server.server_address[1], [0, "path"]],
+            "data": {
+                "init-path": [{"key": "items"}],
+                "iter": [{
+                    "key-path": [{"keys": [0, 1]}, {"key": "n"}],
+                    "values": [[{"key": "t"}]]}]},
+            "values": {"n": {"varid": 0}, "t": {"varid": 1}}}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.shell = DataTreeGrab.DataTreeShell(self.data_def, warnaction = "ignore")
+        # Wait for the requests of a previous test to finish
+        for i in range(50):
+            if PageHandler.active == 0:
+                break
+
+            time.sleep(0.1)
+
+        PageHandler.max_active = 0
+
+    def tearDown(self):
+        self.shell.close_page_pool()
+
+    def test_extract_all(self):
+        # Every page is extracted as with a direct extract_page and failures keep their index
+        paths = ['page/1', 'page/2', 'missing', 'page/3']
+        expected = [[{"n": n, "t": "p%s" % n}, {"n": n + 100, "t": "q"}] for n in (1, 2, 3)]
+        for workers in (1, 2):
+            fetcher = DataTreeFetch.PageFetcher(self.shell, connections = 4, per_host = 2, timeout = 5)
+            results = {}
+            for index, errorcode, result in fetcher.extract_all([{"path": p} for p in paths], workers):
+                results[index] = (errorcode, result)
+
+            fetcher.close()
+            self.assertEqual(sorted(results.keys()), [0, 1, 2, 3])
+            self.assertEqual(results[2], (dte.dtHTTPerror, []))
+            self.assertEqual([results[i][0] for i in (0, 1, 3)], [dte.dtDataOK] * 3)
+            self.assertEqual([results[i][1] for i in (0, 1, 3)], expected)
+
+    def test_per_host_limit(self):
+        # No more than per_host requests are open on one host at a time
+        fetcher = DataTreeFetch.PageFetcher(self.shell, connections = 6, per_host = 2, timeout = 5)
+        fetched = list(fetcher.fetch_all([{"path": 'page/%s' % n} for n in range(12)]))
+        fetcher.close()
+        self.assertEqual(len(fetched), 12)
+        self.assertEqual(set([f[1] for f in fetched]), set([dte.dtDataOK]))
+        self.assertEqual(PageHandler.max_active, 2)
+
+    def test_error_mapping(self):
+        # A timeout and a HTTP error status map on their errorcodes
+        fetcher = DataTreeFetch.PageFetcher(self.shell, connections = 2, per_host = 2, timeout = 0.5)
+        fetched = dict([(f[0], f[1:]) for f in fetcher.fetch_all([{"path": 'slow'}, {"path": 'missing'}])])
+        fetcher.close()
+        self.assertEqual(fetched[0], (dte.dtTimeoutError, None))
+        self.assertEqual(fetched[1], (dte.dtHTTPerror, None))
+
+if __name__ == '__main__':
+    unittest.main()
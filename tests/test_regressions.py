@@ -0,0 +1,395 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Regression cases for DataTreeGrab
+# Run with: python2 -m unittest discover tests
+
+from __future__ import unicode_literals
+import sys, os, datetime, unittest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import DataTreeGrab
+
+class TestInvalidValues(unittest.TestCase):
+    json_def = {
+        "data-format": "json",
+        "data": {
+            "init-path": [{"key": "items"}],
+            "iter": [{
+                "key-path": [{"keys": [0, 1, 2]}, {"key": "id"}],
+                "values": [[{"key": "d", "type": "date"}], [{"key": "t", "type": "time"}]]}]},
+        "values": {"id": {"varid": 0}, "d": {"varid": 1}, "t": {"varid": 2}}}
+
+    json_data = {"items": [
+        {"id": 1, "d": "2017-07-10", "t": "10:20"},
+        {"id": 2, "d": "bad-date", "t": "xx"},
+        {"id": 3, "d": "2017-13-45", "t": "25:99"}]}
+
+    def test_invalid_date(self):
+        # An invalid date or time returns the raw value and is counted
+        shell = DataTreeGrab.DataTreeShell(self.json_def, self.json_data, warnaction = "ignore")
+        self.assertEqual(shell.extract_datalist(), 0)
+        self.assertEqual(shell.result[0]["d"], datetime.date(2017, 7, 10))
+        self.assertEqual([(r["d"], r["t"]) for r in shell.result[1:]],
+            [("bad-date", "xx"), ("2017-13-45", "25:99")])
+        counts = dict([(k[0], v[0]) for k, v in shell.error_counts.items()])
+        self.assertEqual(counts["date type"], 2)
+        self.assertEqual(counts["time type"], 2)
+
+    def test_batch_typing_long_literal(self):
+        # batch_typing must accept the same integers as the per value typing
+        data_def = {
+            "data-format": "json",
+            "data": {
+                "init-path": [{"key": "items"}],
+                "iter": [{
+                    "key-path": [{"keys": [0, 1, 2]}, {"key": "id"}],
+                    "values": [[{"key": "n", "type": "int"}]]}]},
+            "values": {"id": {"varid": 0}, "n": {"varid": 1}}}
+        data = {"items": [{"id": 1, "n": "12"}, {"id": 2, "n": "12L"}, {"id": 3, "n": " 7 "}]}
+        results = []
+        for batch_typing in (False, True):
+            shell = DataTreeGrab.DataTreeShell(data_def, data, warnaction = "ignore")
+            shell.extract_datalist(batch_typing = batch_typing)
+            results.append([r["n"] for r in shell.result])
+
+        self.assertEqual(results[0], results[1])
+
+    def test_batch_typing(self):
+        # batch_typing gives the same values and error counts as the per value typing
+        data_def = {
+            "data-format": "json",
+            "data": {
+                "init-path": [{"key": "items"}],
+                "iter": [{
+                    "key-path": [{"keys": [0, 1, 2, 3]}, {"key": "id"}],
+                    "values": [[{"key": "n", "type": "int"}], [{"key": "f", "type": "float"}],
+                        [{"key": "ts", "type": "timestamp", "multiplier": 1000}],
+                        [{"key": "ds", "type": "datestamp"}], [{"key": "td", "type": "timedelta"}]]}]},
+            "values": {"id": {"varid": 0}, "n": {"varid": 1}, "f": {"varid": 2},
+                "ts": {"varid": 3}, "ds": {"varid": 4}, "td": {"varid": 5}}}
+        data = {"items": [
+            {"id": 1, "n": 12, "f": "1.5", "ts": 1500000000000, "ds": 1500000000, "td": 3600},
+            {"id": 2, "n": "-3", "f": 2, "ts": "1500000000000", "ds": "1500000000", "td": "90"},
+            {"id": 3, "n": "1.5", "f": "x", "ts": "bad", "ds": None, "td": "y"},
+            {"id": 4, "n": " 7 ", "f": "-0.25", "ts": 0, "ds": 0, "td": 0}]}
+        results = []
+        for batch_typing in (False, True):
+            shell = DataTreeGrab.DataTreeShell(data_def, data, warnaction = "ignore")
+            shell.extract_datalist(batch_typing = batch_typing)
+            results.append((shell.result, shell.error_counts))
+
+        self.assertEqual(results[0], results[1])
+
+class PlainLinks(DataTreeGrab.DataTreeShell):
+    # Evaluates every link function on extraction, without folding or the dispatch table
+    def link_functions(self, fid, data = None, default = None):
+        def link_warning(text, severity = 4):
+            pass
+
+        return DataTreeGrab.builtin_link_function(fid, data, default, link_warning, self.current_date, self.timezone)
+
+class AddOnLinks(DataTreeGrab.DataTreeShell):
+    link_function_names = {100: "link_initials"}
+
+    def link_initials(self, data, default):
+        if len(data) == 0 or data[0] in (None, ""):
+            return default
+
+        return "".join([w[0] for w in data[0].split()])
+
+    def add_on_link_functions(self, fid, data = None, default = None):
+        if fid == 101:
+            # Redirect to the built-in first value function
+            return {"fid": 9}
+
+class PlainAddOnLinks(AddOnLinks, PlainLinks):
+    def link_functions(self, fid, data = None, default = None):
+        if fid == 100:
+            return self.link_initials(data, default)
+
+        if fid == 101:
+            fid = 9
+
+        return PlainLinks.link_functions(self, fid, data, default)
+
+class TestLinking(unittest.TestCase):
+    data_def = {
+        "data-format": "json",
+        "data": {
+            "init-path": [{"key": "items"}],
+            "iter": [{
+                "key-path": [{"keys": [0, 1, 2, 3]}, {"key": "id"}],
+                "values": [[{"key": "title"}], [{"key": "genre"}], [{"key": "start", "type": "timestamp"}],
+                    [{"key": "extra"}], [{"key": "sub"}], [{"key": "n", "type": "int"}]]}]},
+        "values": {
+            "id": {"varid": 0},
+            "title": {"varid": 1, "regex": "^(\\w+)", "type": "lower"},
+            "genre": {"funcid": 10, "data": [["news", "film"], ["nieuws", "speelfilm"], {"varid": 2}, "overig"]},
+            "start": {"varid": 3},
+            "full": {"funcid": 2, "data": [{"varid": 1}, " - ", {"varid": 5}]},
+            "const": {"funcid": 2, "data": ["a", "b", {"funcid": 0, "data": ["xyz ", "z"]}]},
+            "first": {"funcid": 9, "data": [{"varid": 5}, "none"]},
+            "n": {"varid": 6, "calc": {"multiplier": 2}, "default": -1},
+            "fixed": {"value": 42}}}
+    data = {"items": [
+        {"id": 1, "title": "Een titel", "genre": "news", "start": 1500000000, "extra": "x", "sub": "Sub", "n": "3"},
+        {"id": 2, "title": "Twee", "genre": "sport", "start": 1500003600, "extra": "y", "n": "x"},
+        {"id": 3, "title": "Drie", "genre": "film", "start": 1500007200, "sub": "Deel 2"},
+        {"id": 4, "title": "Vier vijf", "genre": None, "start": 1500010800, "n": 5}]}
+
+    def extract(self, shell_class = DataTreeGrab.DataTreeShell, **kwargs):
+        shell = shell_class(self.data_def, self.data, warnaction = "ignore")
+        shell.extract_datalist(**kwargs)
+        return shell
+
+    def test_skip_unused(self):
+        # Skipping the value no link_def refers to leaves the linked values unchanged
+        plain = self.extract()
+        skipped = self.extract(skip_unused = True)
+        self.assertEqual(plain.result, skipped.result)
+        self.assertEqual([r[4] for r in plain.searchtree.result], ["x", "y", None, None])
+        self.assertEqual([r[4] for r in skipped.searchtree.result], [None] * 4)
+
+    def test_folding(self):
+        # A link function on constants is evaluated on conversion to what it gives on extraction
+        folded = self.extract()
+        self.assertTrue(folded.data_def["values"]["const"][0] & folded.dtc.linkFolded)
+        self.assertEqual(folded.result, self.extract(PlainLinks).result)
+
+    def test_compiled_link_defs(self):
+        # The link_defs are compiled again for a new data_def
+        other = dict(self.data_def)
+        other["values"] = {"id": {"varid": 0}, "title": {"varid": 1}}
+        shell = DataTreeGrab.DataTreeShell(other, warnaction = "ignore")
+        shell.init_data_def(self.data_def)
+        shell.init_data(self.data)
+        shell.extract_datalist()
+        self.assertEqual(shell.result, self.extract(PlainLinks).result)
+        self.assertEqual([shell.link_values(r) for r in shell.searchtree.result], shell.result)
+
+    def test_dispatch_table(self):
+        # Built-in and add-on link functions from the dispatch table link as when called directly
+        data_def = dict(self.data_def)
+        data_def["values"] = dict(self.data_def["values"])
+        data_def["values"]["initials"] = {"funcid": 100, "data": [{"varid": 1}]}
+        data_def["values"]["redirected"] = {"funcid": 101, "data": [{"varid": 5}, "none"]}
+        shells = []
+        for shell_class in (AddOnLinks, PlainAddOnLinks):
+            shells.append(shell_class(data_def, self.data, warnaction = "ignore"))
+            shells[-1].set_call_stats()
+            shells[-1].extract_datalist()
+
+        results = [shell.result for shell in shells]
+        self.assertEqual(results[0], results[1])
+        self.assertEqual([r["initials"] for r in results[0]], ["Et", "T", "D", "Vv"])
+        self.assertEqual([r["redirected"] for r in results[0]], [r["first"] for r in results[0]])
+        self.assertEqual(shells[0].get_call_stats()[("link", 100)]["calls"], 4)
+
+    def test_iter_datalist(self):
+        # The streamed linked values equal the extracted ones
+        plain = self.extract()
+        shell = DataTreeGrab.DataTreeShell(self.data_def, self.data, warnaction = "ignore")
+        self.assertEqual(list(shell.iter_datalist()), plain.result)
+        self.assertEqual(shell.error_counts, plain.error_counts)
+
+    def test_extraction_paths(self):
+        # Every combination of the extraction options links the same values
+        plain = self.extract().result
+        for kwargs in ({"workers": 2}, {"batch_typing": True}, {"columnar": True}, {"skip_unused": True},
+                {"workers": 2, "batch_typing": True, "skip_unused": True},
+                {"workers": 2, "columnar": True},
+                {"columnar": True, "batch_typing": True, "skip_unused": True}):
+            result = self.extract(**kwargs).result
+            if kwargs.get("columnar", False):
+                result = [row.to_dict() for row in result]
+
+            self.assertEqual(result, plain, kwargs)
+
+class TestWarningFilters(unittest.TestCase):
+    def test_wants_specific_filters(self):
+        # A message specific "ignore" filter leaves the decision to the next filters
+        warnings = DataTreeGrab._Warnings("ignore", sys.stderr, 0)
+        warnings.filterwarnings("ignore", "Invalid", DataTreeGrab.dtConversionWarning)
+        self.assertFalse(warnings.wants(DataTreeGrab.dtConversionWarning))
+        warnings.set_warnaction("default")
+        warnings.filterwarnings("ignore", "Invalid", DataTreeGrab.dtConversionWarning)
+        self.assertTrue(warnings.wants(DataTreeGrab.dtConversionWarning))
+        warnings.set_warnaction("ignore")
+        warnings.filterwarnings("always", "Invalid", DataTreeGrab.dtConversionWarning)
+        self.assertTrue(warnings.wants(DataTreeGrab.dtConversionWarning))
+
+class TestMatchLists(unittest.TestCase):
+    html_page = """<html><body><div id="main"><h1 class="title">Guide &amp; More</h1>
+        <table class="prog">
+        <tr class="row"><td>20:00</td><td>Nieuws</td><td>NL1</td><td>12</td></tr>
+        <tr class="row"><td>20:30</td><td>Sport</td><td>NL2</td><td>7</td></tr>
+        <tr class="row odd"><td>21:15</td><td>Film</td><td>NL3</td><td>x</td></tr>
+        <tr class="other"><td>22:00</td><td>Weer</td></tr>
+        </table><p>Tail test<b>bold</b>After Bold</p></div></body></html>"""
+
+    def html_def(self, values):
+        return {
+            "data-format": "html",
+            "data": {
+                "init-path": [{"tag": "html"}, {"tag": "body"}, {"tag": "div", "attrs": {"id": "main"}}],
+                "iter": [{
+                    "key-path": [{"tag": "table", "attrs": {"class": "prog"}},
+                        {"tag": "tr", "attrs": {"class": ["row", "row odd"]}}, {"tag": "td", "index": 0}],
+                    "values": values}]}}
+
+    def extract(self, values):
+        shell = DataTreeGrab.DataTreeShell(self.html_def(values), self.html_page, warnaction = "ignore")
+        shell.extract_datalist()
+        return shell.searchtree.result
+
+    def test_literal_and_linked(self):
+        # A literal match list resolved on conversion selects as the same values given by a link
+        literal = self.extract([
+            [{"path": "parent"}, {"tags": ["TD", "th"], "text": ["NIEUWS", "sport", "Film"], "select": "index"}]])
+        linked = self.extract([
+            [{"path": "parent"}, {"tag": "td", "index": 1, "link": 0},
+                {"path": "parent"}, {"tag": "td", "text": {"link": 0}, "select": "index"}]])
+        self.assertEqual(literal, [["20:00", 1], ["20:30", 1], ["21:15", 1]])
+        self.assertEqual(literal, linked)
+
+    def test_folded_text(self):
+        # The stored lower case text and tail match as the text and tail lowered on comparison
+        shell = DataTreeGrab.DataTreeShell(self.html_def([
+            [{"path": "root"}, {"tag": "html"}, {"tag": "body"}, {"tag": "div"},
+                {"tag": "H1", "text": "GUIDE & MORE", "select": "presence"}],
+            [{"path": "root"}, {"tag": "html"}, {"tag": "body"}, {"tag": "div"}, {"tag": "p"},
+                {"tag": "b", "tail": "after bold", "select": "presence"}]]), self.html_page, warnaction = "ignore")
+        shell.extract_datalist()
+        self.assertEqual([r[1:] for r in shell.searchtree.result], [[True, True]] * 3)
+        nlist = [shell.searchtree.root]
+        while len(nlist) > 0:
+            node = nlist.pop()
+            self.assertEqual((node.text_lower, node.tail_lower), (node.text.lower(), node.tail.lower()))
+            nlist.extend(node.children)
+
+class TestTypeMemo(unittest.TestCase):
+    data_def = {
+        "data-format": "json",
+        "timezone": "Europe/Amsterdam",
+        "data": {
+            "init-path": [{"key": "items"}],
+            "iter": [{
+                "key-path": [{"keys": [0, 1, 2, 3]}, {"key": "id"}],
+                "values": [[{"key": "ts", "type": "timestamp"}],
+                    [{"key": "dts", "type": "datetimestring"}], [{"key": "t", "type": "time"}]]}]}}
+    data = {"items": [
+        {"id": 1, "ts": 1500000000, "dts": "2017-07-10 20:00:00", "t": "20:00"},
+        {"id": 2, "ts": 1500000000, "dts": "2017-07-10 20:00:00", "t": "20:00"},
+        {"id": 3, "ts": 1500003600, "dts": "2017-07-10 21:00:00", "t": "21:00"},
+        {"id": 4, "ts": 1500000000, "dts": "2017-07-10 20:00:00", "t": "20:00"}]}
+
+    def test_memo_and_plain(self):
+        # The memoised conversions equal the plain ones, also after a timezone change
+        memo = DataTreeGrab.DataTreeShell(self.data_def, self.data, warnaction = "ignore")
+        plain = DataTreeGrab.DataTreeShell(self.data_def, self.data, warnaction = "ignore")
+        plain.searchtree.set_type_memo_size(0)
+        results = []
+        for timezone in ("Europe/Amsterdam", "America/New_York"):
+            for shell in (memo, plain):
+                shell.set_timezone(timezone)
+                shell.extract_datalist()
+                results.append(shell.searchtree.result)
+
+            self.assertEqual(results[-2], results[-1])
+
+        self.assertNotEqual(results[0], results[2])
+        self.assertTrue(memo.searchtree.type_memo_stats()["hits"] > 0)
+        self.assertEqual(plain.searchtree.type_memo_stats()["hits"], 0)
+
+class TestUrlPlan(unittest.TestCase):
+    data_def = {
+        "data-format": "json",
+        "data": {"init-path": []},
+        "url": ["http://example.com/", [0, "ch"], "/", [11, ["day"]], "/", 11, "/", [14, []], "?", 4],
+        "url-header": {"X-Day": [11, ["day"]]},
+        "url-data": {"from": [14, ["start", "end"]]},
+        "url-date-format": "%Y%m%d",
+        "url-weekdays": ["ma", "di", "wo", "do", "vr", "za", "zo"],
+        "url-relative-weekdays": {0: "vandaag"}}
+
+    def test_plan_and_get_url(self):
+        # The plan gives for every url_data what get_url gives on it
+        url_data_list = [{"ch": "c%s" % c, "day": d, "offset": d - 1, "start": d, "end": d + 2,
+            "count": 10, "cnt-offset": c} for d in range(-2, 9) for c in range(3)]
+        for url_date_type in (0, 1, 2):
+            data_def = dict(self.data_def)
+            data_def["url-date-type"] = url_date_type
+            shell = DataTreeGrab.DataTreeShell(data_def, warnaction = "ignore")
+            plan = shell.get_url_plan(url_data_list)
+            self.assertEqual(plan, [shell.get_url(url_data, False) for url_data in url_data_list])
+            self.assertEqual(shell.url_dates, None)
+
+class TestCdataDefCodec(unittest.TestCase):
+    def layout(self, item):
+        # The types of the converted data_def as a comparable structure
+        if isinstance(item, dict):
+            return ("dict", sorted([(k, self.layout(v)) for k, v in item.items()]))
+
+        if isinstance(item, (list, tuple)):
+            return (type(item).__name__, [self.layout(v) for v in item])
+
+        if isinstance(item, (set, frozenset)):
+            return (type(item).__name__, sorted(item))
+
+        return type(item).__name__
+
+    def test_round_trip(self):
+        # A decoded data_def equals the converted one and extracts the same
+        for data_def, data in ((TestLinking.data_def, TestLinking.data),
+                (TestMatchLists("test_literal_and_linked").html_def([
+                    [{"path": "parent"}, {"tag": "td", "text": ["Film", "Nieuws"], "select": "index"}]]),
+                TestMatchLists.html_page)):
+            plain = DataTreeGrab.DataTreeShell(data_def, data, warnaction = "ignore")
+            decoded = DataTreeGrab.decode_cdata_def(DataTreeGrab.encode_cdata_def(plain.data_def))
+            self.assertEqual(decoded, plain.data_def)
+            self.assertEqual(self.layout(decoded), self.layout(plain.data_def))
+            shell = DataTreeGrab.DataTreeShell(decoded, data, warnaction = "ignore")
+            plain.extract_datalist()
+            shell.extract_datalist()
+            self.assertEqual(shell.result, plain.result)
+
+class TestPathDefCache(unittest.TestCase):
+    def make_shell(self, splitter, value):
+        data_def = {
+            "data-format": "json",
+            "date-splitter": splitter,
+            "data": {"init-path": [{"key": "items"}]}}
+        return DataTreeGrab.DataTreeShell(data_def, {"items": [{"d": value}]}, warnaction = "ignore")
+
+    def test_defaults_per_tree(self):
+        # An ad-hoc path_def is converted with the defaults of the data_def of each tree
+        path_def = [{"key": "items"}, {"index": 0}, {"key": "d", "type": "date"}]
+        for splitter, value in (("-", "2017-07-10"), ("/", "2017/07/10")):
+            shell = self.make_shell(splitter, value)
+            self.assertEqual(shell.searchtree.find_data_value(path_def, shell.searchtree.root),
+                datetime.date(2017, 7, 10))
+
+class TestSharedDef(unittest.TestCase):
+    data_def = {
+        "data-format": "json",
+        "date-splitter": "/",
+        "data": {"init-path": [{"key": "items"}]}}
+
+    def test_registry_hit(self):
+        # A tree getting its data_def from the registry converts ad-hoc path_defs alike
+        path_def = [{"key": "items"}, {"index": 0}, {"key": "d", "type": "date"}]
+        for i in range(2):
+            tree = DataTreeGrab.JSONtree({"items": [{"d": "2017/07/10"}]}, warnaction = "ignore")
+            tree.shared_def = True
+            tree.check_data_def(self.data_def)
+            self.assertEqual(tree.find_data_value(path_def, tree.root), datetime.date(2017, 7, 10))
+
+    def test_private_by_default(self):
+        # Only with shared_def is the converted data_def frozen
+        shell = DataTreeGrab.DataTreeShell(self.data_def, warnaction = "ignore")
+        self.assertNotIsInstance(shell.data_def, DataTreeGrab.FrozenDict)
+        shell = DataTreeGrab.DataTreeShell(self.data_def, warnaction = "ignore", shared_def = True)
+        self.assertIsInstance(shell.data_def, DataTreeGrab.FrozenDict)
+
+if __name__ == '__main__':
+    unittest.main()